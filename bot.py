@@ -2,8 +2,13 @@ import os
 import re
 import discord
 import aiohttp
+import orjson
 import asyncio
-from typing import Dict, Optional
+import hashlib
+import signal
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 import time
 
 DISCORD_TOKEN = os.environ["DISCORD_TOKEN"]
@@ -11,6 +16,24 @@ LLM_URL = os.environ.get("LLM_URL", "http://localhost:8080/v1/chat/completions")
 LLM_MODEL = os.environ.get("LLM_MODEL", "qwen")
 DEBUG_MODE = os.environ.get("DEBUG_MODE", "false").lower() == "true"
 
+# Translation cache configuration
+TRANSLATE_CACHE_SIZE = int(os.environ.get("TRANSLATE_CACHE_SIZE", "2048"))
+TRANSLATE_SEMANTIC_CACHE_ENABLED = os.environ.get("TRANSLATE_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+TRANSLATE_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("TRANSLATE_SEMANTIC_CACHE_THRESHOLD", "0.93"))
+TRANSLATE_SEMANTIC_CACHE_SIZE = int(os.environ.get("TRANSLATE_SEMANTIC_CACHE_SIZE", "10000"))
+TRANSLATE_SEMANTIC_CACHE_MODEL = os.environ.get("TRANSLATE_SEMANTIC_CACHE_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+
+# Translation batching configuration
+TRANSLATE_BATCH_ENABLED = os.environ.get("TRANSLATE_BATCH_ENABLED", "true").lower() == "true"
+TRANSLATE_BATCH_MAX_SIZE = int(os.environ.get("TRANSLATE_BATCH_MAX_SIZE", "16"))
+TRANSLATE_BATCH_WAIT_MS = int(os.environ.get("TRANSLATE_BATCH_WAIT_MS", "30"))
+
+# Max attachment URLs posted at once when forwarding a message
+ATTACHMENT_SEND_CONCURRENCY = 3
+
+# Minimum seconds between edits of a streaming chat reply (Discord allows ~5 edits per 5s)
+STREAM_EDIT_INTERVAL = 1.0
+
 # RAG Configuration
 RAG_ENABLED = os.environ.get("RAG_ENABLED", "false").lower() == "true"
 RAG_DATA_DIR = os.environ.get("RAG_DATA_DIR", "/data")
@@ -38,17 +61,103 @@ if pairs_str:
 # Will be populated on bot ready
 channel_pairs: Dict[int, int] = {}
 
+# LLM request bodies are serialized with orjson and sent as raw bytes
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def split_payload_template(payload: Dict, placeholder: str) -> Tuple[bytes, bytes]:
+    """Serialize a payload once and split it around a placeholder string value.
+
+    A request body is then head + orjson.dumps(value) + tail, so the constant
+    fields aren't rebuilt and re-serialized for every request.
+    """
+    head, tail = orjson.dumps(payload).split(orjson.dumps(placeholder))
+    return head, tail
+
+
+# Translation instructions, sent as a fixed system message so the LLM server's
+# prefix cache can reuse them across requests (keep these byte-identical)
+_SYS_ZH2EN = "Translate the following Chinese text to English. Output ONLY the translation."
+_SYS_EN2ZH = "Translate the following English text to Chinese. Output ONLY the translation."
+_SYS_BATCH_ZH2EN = (
+    "Translate each Chinese text in the JSON array sent by the user to English. Output ONLY a JSON "
+    "array of strings with the translations, in the same order, one per text."
+)
+_SYS_BATCH_EN2ZH = (
+    "Translate each English text in the JSON array sent by the user to Chinese. Output ONLY a JSON "
+    "array of strings with the translations, in the same order, one per text."
+)
+
+# Pre-serialized translation request bodies (per direction) around the user text
+_TEXT_PLACEHOLDER = "\x00text\x00"
+
+
+def _translate_body_template(system_prompt: str) -> Tuple[bytes, bytes]:
+    """Build the pre-serialized head and tail of a translation request body."""
+    return split_payload_template({
+        "model": LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": _TEXT_PLACEHOLDER}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 1000
+    }, _TEXT_PLACEHOLDER)
+
+
+_TRANSLATE_BODY_ZH2EN = _translate_body_template(_SYS_ZH2EN)
+_TRANSLATE_BODY_EN2ZH = _translate_body_template(_SYS_EN2ZH)
+
+# Shared HTTP session for LLM requests (created on bot ready, closed on shutdown)
+aiohttp_session: Optional[aiohttp.ClientSession] = None
+
+# Exact-match translation cache: blake2b(text) -> translation, in LRU order
+_translate_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+# Designated RAG channel check results by channel ID (cleared when a channel changes)
+_rag_channel_cache: Dict[int, bool] = {}
+
+# Bot mention strings (<@id> and <@!id>), set on bot ready
+_MENTION_TOKENS: tuple = ()
+
+# Max message IDs remembered for reaction dedup and edit tracking (oldest dropped first)
+MESSAGE_TRACKING_LIMIT = 50_000
+
 # Track messages that have been translated via reaction to prevent re-translation
-translated_messages: set = set()
+# (insertion-ordered so the oldest can be evicted; values unused)
+translated_messages: "OrderedDict[int, None]" = OrderedDict()
 
 # Track message ID mappings: original_message_id -> translation_message_id
 # Used for updating translations when original message is edited
-message_mappings: Dict[int, int] = {}
+message_mappings: "OrderedDict[int, int]" = OrderedDict()
 
 # RAG Manager (initialized on bot ready if enabled)
 rag_manager = None
+rag_flush_task = None
 if RAG_ENABLED:
-    from rag import RAGManager
+    from rag import RAGManager, RAG_FLUSH_INTERVAL
+
+# Semantic translation caches, one per direction ("zh2en" / "en2zh"), initialized on
+# bot ready if enabled. A multilingual model embeds a sentence and its translation
+# almost identically, so a shared cache would hand a translation back as its own source
+semantic_caches: Dict[str, "SemanticCache"] = {}
+if TRANSLATE_SEMANTIC_CACHE_ENABLED:
+    from semantic_cache import SemanticCache
+
+# Translation batcher (started on bot ready if enabled)
+translate_batcher = None
+
+# Precompiled patterns for channel names, topics and message text
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+_EMOJI_PREFIX_RE = re.compile(r'^([\U0001F000-\U0001F9FF]+)')
+_EMOJI_STRIP_RE = re.compile(r'^[\U0001F000-\U0001F9FF\s\-_]+')
+_PAIR_TOPIC_RE = re.compile(r'(?:pair|translate):\s*<?#?(\S+?)>?(?:\s|$|,|\|)', re.IGNORECASE)
+_LANG_TOPIC_RE = re.compile(r'lang:\s*(\w+)', re.IGNORECASE)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+# URLs, custom emoji (<:name:id>) and user/role/channel mentions (<@id>, <@&id>, <#id>)
+_NON_TEXT_RE = re.compile(r'https?://\S+|<a?:\w+:\d+>|<(?:@[!&]?|#)\d+>')
+# No letters or CJK at all: punctuation, digits, emoji, whitespace
+_NO_WORDS_RE = re.compile(r'[\W\d_]+')
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -65,32 +174,72 @@ def debug_log(message: str):
 
 def has_chinese(text: str) -> bool:
     """Check if text contains Chinese characters."""
-    return bool(re.search(r'[\u4e00-\u9fff]', text))
+    # isascii() is a constant-time flag check, so plain English skips the scan
+    return not text.isascii() and _CJK_RE.search(text) is not None
+
+
+def should_translate(content: str) -> bool:
+    """Check if a message has text worth sending to the LLM.
+
+    Pure links, emoji, mentions, numbers and punctuation come back unchanged
+    from translation, so they skip the LLM round-trip.
+    """
+    text = _NON_TEXT_RE.sub('', content).strip()
+    # A single Chinese character is a word; a single Latin letter isn't
+    if len(text) < 2 and not has_chinese(text):
+        return False
+    return not _NO_WORDS_RE.fullmatch(text)
 
 
 def strip_emoji(channel_name: str) -> str:
     """Remove emoji from start of channel name."""
     # Remove emoji and common separators from start
-    return re.sub(r'^[\U0001F000-\U0001F9FF\s\-_]+', '', channel_name).strip()
+    return _EMOJI_STRIP_RE.sub('', channel_name).strip()
+
+
+@dataclass
+class _ChannelView:
+    """Channel attributes used for pairing, read once per channel."""
+    id: int
+    name: str
+    topic: Optional[str]
+    emoji: Optional[str]
+    is_cjk: bool
+
+
+def _emoji_of(channel_name: str) -> Optional[str]:
+    """Get the emoji prefix of a channel name, if any."""
+    emoji_match = _EMOJI_PREFIX_RE.match(channel_name)
+    return emoji_match.group(1) if emoji_match else None
 
 
-def find_channel_by_name(guild: discord.Guild, name: str) -> Optional[discord.TextChannel]:
+def get_channel_views(guild: discord.Guild) -> List[_ChannelView]:
+    """Snapshot a guild's text channels in a single pass."""
+    return [
+        _ChannelView(ch.id, ch.name, ch.topic, _emoji_of(ch.name), has_chinese(ch.name))
+        for ch in guild.text_channels
+    ]
+
+
+def remember_message(tracker: OrderedDict, message_id: int, value=None):
+    """Record a message ID in a bounded tracker, evicting the oldest entry when full."""
+    tracker[message_id] = value
+    tracker.move_to_end(message_id)
+    if len(tracker) > MESSAGE_TRACKING_LIMIT:
+        tracker.popitem(last=False)
+
+
+def find_channel_by_name(
+    name: str,
+    by_name: Dict[str, _ChannelView],
+    by_stripped_name: Dict[str, _ChannelView]
+) -> Optional[_ChannelView]:
     """Find channel by name, trying exact match first, then without emoji."""
     # Remove # prefix if present
     name = name.lstrip('#').strip()
 
-    # Try exact match first
-    for channel in guild.text_channels:
-        if channel.name == name:
-            return channel
-
-    # Try without emoji
-    name_stripped = strip_emoji(name)
-    for channel in guild.text_channels:
-        if strip_emoji(channel.name) == name_stripped:
-            return channel
-
-    return None
+    # Try exact match first, then without emoji
+    return by_name.get(name) or by_stripped_name.get(strip_emoji(name))
 
 
 def parse_pair_from_topic(topic: str) -> Optional[str]:
@@ -100,7 +249,7 @@ def parse_pair_from_topic(topic: str) -> Optional[str]:
 
     # Match "pair: channel" or "translate: channel"
     # Supports: pair:channel, pair: channel, pair:#channel, pair:<#123>
-    match = re.search(r'(?:pair|translate):\s*<?#?(\S+?)>?(?:\s|$|,|\|)', topic, re.IGNORECASE)
+    match = _PAIR_TOPIC_RE.search(topic)
     if match:
         return match.group(1)
     return None
@@ -112,7 +261,7 @@ def parse_lang_from_topic(topic: str) -> Optional[str]:
         return None
 
     # Match "lang: xx" where xx is a language code
-    match = re.search(r'lang:\s*(\w+)', topic, re.IGNORECASE)
+    match = _LANG_TOPIC_RE.search(topic)
     if match:
         return match.group(1).lower()
     return None
@@ -141,26 +290,20 @@ def get_channel_language(channel: discord.TextChannel) -> str:
         return 'en'
 
 
-def auto_detect_pairs(guild: discord.Guild) -> Dict[int, int]:
+def auto_detect_pairs(views: List[_ChannelView]) -> Dict[int, int]:
     """Auto-detect channel pairs by emoji prefix and language."""
     pairs = {}
-    channels = list(guild.text_channels)
 
     # Group channels by emoji prefix
     emoji_groups: Dict[str, list] = {}
-    for channel in channels:
-        # Extract emoji from channel name
-        emoji_match = re.match(r'^([\U0001F000-\U0001F9FF]+)', channel.name)
-        if emoji_match:
-            emoji = emoji_match.group(1)
-            if emoji not in emoji_groups:
-                emoji_groups[emoji] = []
-            emoji_groups[emoji].append(channel)
+    for view in views:
+        if view.emoji:
+            emoji_groups.setdefault(view.emoji, []).append(view)
 
     # Within each emoji group, pair Chinese and non-Chinese channels
     for emoji, group in emoji_groups.items():
-        chinese_channels = [ch for ch in group if has_chinese(ch.name)]
-        english_channels = [ch for ch in group if not has_chinese(ch.name)]
+        chinese_channels = [ch for ch in group if ch.is_cjk]
+        english_channels = [ch for ch in group if not ch.is_cjk]
 
         # Simple pairing: first Chinese with first English
         if chinese_channels and english_channels:
@@ -175,17 +318,25 @@ def auto_detect_pairs(guild: discord.Guild) -> Dict[int, int]:
 def build_channel_pairs(guild: discord.Guild) -> Dict[int, int]:
     """Build complete channel pair mapping with priority: explicit pair > manual > auto."""
     pairs = {}
+    views = get_channel_views(guild)
 
     # Step 1: Auto-detect as base layer
-    pairs.update(auto_detect_pairs(guild))
+    pairs.update(auto_detect_pairs(views))
 
     # Step 2: Apply manual pairs (override auto-detect)
     pairs.update(MANUAL_PAIRS)
     if MANUAL_PAIRS:
         debug_log(f"Applied {len(MANUAL_PAIRS) // 2} manual pair overrides")
 
+    # Name lookups for topic pair references (first channel wins, as with a linear scan)
+    by_name: Dict[str, _ChannelView] = {}
+    by_stripped_name: Dict[str, _ChannelView] = {}
+    for view in views:
+        by_name.setdefault(view.name, view)
+        by_stripped_name.setdefault(strip_emoji(view.name), view)
+
     # Step 3: Parse channel topics for explicit pair declarations (highest priority)
-    for channel in guild.text_channels:
+    for channel in views:
         if channel.topic:
             pair_ref = parse_pair_from_topic(channel.topic)
             if pair_ref:
@@ -195,7 +346,7 @@ def build_channel_pairs(guild: discord.Guild) -> Dict[int, int]:
                     pair_channel = guild.get_channel(pair_id)
                 except ValueError:
                     # Not an ID, search by name
-                    pair_channel = find_channel_by_name(guild, pair_ref)
+                    pair_channel = find_channel_by_name(pair_ref, by_name, by_stripped_name)
 
                 if pair_channel:
                     # Bidirectional mapping
@@ -208,6 +359,27 @@ def build_channel_pairs(guild: discord.Guild) -> Dict[int, int]:
     return pairs
 
 
+def is_rag_channel(channel: discord.TextChannel) -> bool:
+    """Check if channel is a designated RAG channel, cached per channel."""
+    is_rag = _rag_channel_cache.get(channel.id)
+    if is_rag is None:
+        is_rag = rag_manager.is_rag_channel(channel.name, channel.topic)
+        _rag_channel_cache[channel.id] = is_rag
+    return is_rag
+
+
+async def forward_attachments(channel: discord.TextChannel, attachments: List[discord.Attachment]):
+    """Post attachment URLs to a channel concurrently."""
+    # Stay under Discord's per-channel send rate limit (5 per 5s)
+    semaphore = asyncio.Semaphore(ATTACHMENT_SEND_CONCURRENCY)
+
+    async def send(att: discord.Attachment):
+        async with semaphore:
+            await channel.send(att.url)
+
+    await asyncio.gather(*(send(att) for att in attachments))
+
+
 async def load_pinned_messages(guild: discord.Guild):
     """Load all pinned messages from guild channels into RAG."""
     if not RAG_ENABLED or not RAG_PINNED_ENABLED or not rag_manager:
@@ -241,13 +413,13 @@ async def load_pinned_messages(guild: discord.Guild):
                 if not content or len(content) < 2:
                     continue
 
-                # Chunk and extract
+                # Chunk and extract (queued together so they share extraction batches)
                 chunks = await rag_manager.chunk_message_with_context(content)
-                for chunk in chunks:
-                    await rag_manager.extract_facts_from_message(
-                        message, chunk, is_rag_channel=True
-                    )
-                    total_facts += 1
+                await asyncio.gather(*(
+                    rag_manager.extract_facts_from_message(message, chunk, is_rag_channel=True)
+                    for chunk in chunks
+                ))
+                total_facts += len(chunks)
 
         except discord.Forbidden:
             debug_log(f"No permission to read pins in #{channel.name}")
@@ -258,45 +430,355 @@ async def load_pinned_messages(guild: discord.Guild):
         print(f"[RAG] Loaded {total_facts} fact(s) from pinned messages in {guild.name}")
 
 
+def cache_translation(key: bytes, translation: str):
+    """Store a translation in the exact-match cache, evicting the oldest entry."""
+    if TRANSLATE_CACHE_SIZE <= 0:
+        return
+    _translate_cache[key] = translation
+    _translate_cache.move_to_end(key)
+    if len(_translate_cache) > TRANSLATE_CACHE_SIZE:
+        _translate_cache.popitem(last=False)
+
+
 async def translate(text: str) -> Optional[str]:
-    """Translate text using the LLM API."""
-    # Detect direction based on Chinese character presence
-    if has_chinese(text):
-        prompt = f"Translate the following Chinese text to English. Output ONLY the translation:\n\n{text}"
+    """Translate text using the LLM API, with exact and semantic caches in front."""
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    cached = _translate_cache.get(key)
+    if cached is not None:
+        _translate_cache.move_to_end(key)
+        debug_log("Translation cache hit")
+        return cached
+
+    # Near-duplicate lookup by embedding similarity, among texts translated the same way
+    embedding = None
+    semantic_cache = semantic_caches.get("zh2en" if has_chinese(text) else "en2zh")
+    if semantic_cache:
+        try:
+            embedding, cached = await semantic_cache.lookup(text)
+        except Exception as e:
+            print(f"Semantic cache error: {e}")
+        if cached is not None:
+            debug_log("Semantic translation cache hit")
+            cache_translation(key, cached)
+            return cached
+
+    if translate_batcher:
+        translation = await translate_batcher.submit(text)
     else:
-        prompt = f"Translate the following English text to Chinese. Output ONLY the translation:\n\n{text}"
+        translation = await request_translation(text)
+
+    if translation:
+        cache_translation(key, translation)
+        if semantic_cache and embedding is not None:
+            semantic_cache.add(embedding, translation)
+
+    return translation
+
+
+async def request_translation(text: str) -> Optional[str]:
+    """Request a translation from the LLM API."""
+    # Detect direction based on Chinese character presence
+    head, tail = _TRANSLATE_BODY_ZH2EN if has_chinese(text) else _TRANSLATE_BODY_EN2ZH
+    body = head + orjson.dumps(text) + tail
+
+    try:
+        async with aiohttp_session.post(LLM_URL, data=body, headers=JSON_HEADERS) as resp:
+            if resp.status == 200:
+                data = orjson.loads(await resp.read())
+                return data["choices"][0]["message"]["content"].strip()
+            else:
+                print(f"LLM API error: {resp.status}")
+    except Exception as e:
+        print(f"Translation error: {e}")
+    return None
+
+
+async def request_batch_translation(texts: List[str]) -> Optional[List[str]]:
+    """Request translations for several texts (all in the same language) in one LLM call."""
+    system_prompt = _SYS_BATCH_ZH2EN if has_chinese(texts[0]) else _SYS_BATCH_EN2ZH
 
     payload = {
         "model": LLM_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": orjson.dumps(texts).decode()}
+        ],
         "temperature": 0.3,
-        "max_tokens": 1000
+        "max_tokens": 1000 * len(texts)
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(LLM_URL, json=payload) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data["choices"][0]["message"]["content"].strip()
-                else:
-                    print(f"LLM API error: {resp.status}")
+        async with aiohttp_session.post(LLM_URL, data=orjson.dumps(payload), headers=JSON_HEADERS) as resp:
+            if resp.status != 200:
+                print(f"LLM API error during batch translation: {resp.status}")
+                return None
+            data = orjson.loads(await resp.read())
+            response_text = data["choices"][0]["message"]["content"].strip()
     except Exception as e:
-        print(f"Translation error: {e}")
-    return None
+        print(f"Batch translation error: {e}")
+        return None
+
+    # Parse JSON array from response
+    try:
+        json_match = _JSON_ARRAY_RE.search(response_text)
+        translations = orjson.loads(json_match.group(0) if json_match else response_text)
+    except orjson.JSONDecodeError as e:
+        debug_log(f"Failed to parse batch translation response: {e}")
+        return None
+
+    if (not isinstance(translations, list) or len(translations) != len(texts)
+            or not all(isinstance(t, str) for t in translations)):
+        debug_log(f"Batch translation returned {len(translations) if isinstance(translations, list) else 'no'} results for {len(texts)} texts")
+        return None
+
+    return [t.strip() for t in translations]
+
+
+class TranslateBatcher:
+    """Coalesces concurrent translate() calls into batched LLM requests."""
+
+    def __init__(self, max_batch: int = 16, max_wait_ms: int = 30):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        # Keep references to in-flight batches so they aren't garbage collected
+        self.pending: set = set()
+
+    def start(self):
+        """Start the background collector task."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Stop the collector task."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, text: str) -> Optional[str]:
+        """Queue text for translation and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _collect(self):
+        """Collect up to max_batch requests within max_wait and dispatch them together."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            task = asyncio.create_task(self._dispatch(batch))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _dispatch(self, batch: list):
+        """Translate a batch, one LLM request per translation direction."""
+        groups: Dict[bool, list] = {}
+        for text, future in batch:
+            groups.setdefault(has_chinese(text), []).append((text, future))
+
+        await asyncio.gather(*(self._translate_group(group) for group in groups.values()))
+
+    async def _translate_group(self, group: list):
+        """Translate texts of one direction and resolve their futures."""
+        texts = [text for text, _ in group]
+        try:
+            translations = None
+            if len(texts) > 1:
+                translations = await request_batch_translation(texts)
+                if translations:
+                    debug_log(f"Batch translated {len(texts)} messages in one request")
+
+            # Single text, or the batch response couldn't be used
+            if translations is None:
+                translations = await asyncio.gather(*(request_translation(text) for text in texts))
+        except Exception as e:
+            print(f"Batch translation error: {e}")
+            translations = [None] * len(texts)
+
+        for (_, future), translation in zip(group, translations):
+            if not future.done():
+                future.set_result(translation)
+
+
+def split_message(text: str, limit: int = 2000) -> List[str]:
+    """Split text into Discord-sized messages at line boundaries (Discord limit: 2000 chars)."""
+    if len(text) <= limit:
+        return [text]
+
+    # Split at newlines to avoid cutting mid-sentence; collect lines in a list
+    # with a running length so building each chunk stays linear
+    chunks = []
+    buf: List[str] = []
+    buf_len = 0
+    for line in text.split("\n"):
+        add = len(line) + 1
+        if buf_len + add > limit and buf:
+            chunks.append("".join(buf))
+            buf, buf_len = [], 0
+        buf.append(line)
+        buf.append("\n")
+        buf_len += add
+    if buf:
+        chunks.append("".join(buf))
+    return chunks
+
+
+async def stream_chat_response(message: discord.Message, payload: Dict):
+    """Stream an LLM chat response into Discord replies, editing them as tokens arrive."""
+    loop = asyncio.get_running_loop()
+
+    # Placeholder reply (sent below), edited as the response streams in; long
+    # responses continue in follow-up messages
+    reply_msg = None
+    sent = []
+    shown = []
+    response = ""
+
+    async def update_messages():
+        """Bring the sent messages in line with the response so far."""
+        for i, chunk in enumerate(split_message(response.strip())):
+            if i < len(sent):
+                if shown[i] != chunk:
+                    await sent[i].edit(content=chunk)
+                    shown[i] = chunk
+            else:
+                sent.append(await message.channel.send(chunk))
+                shown.append(chunk)
+
+    try:
+        reply_msg = await message.reply("…")
+        sent.append(reply_msg)
+        shown.append("…")
+
+        async with aiohttp_session.post(LLM_URL, data=orjson.dumps(payload), headers=JSON_HEADERS) as resp:
+            if resp.status != 200:
+                await reply_msg.edit(content=f"Sorry, I encountered an error: HTTP {resp.status}")
+                print(f"LLM API error: {resp.status}")
+                return
+
+            if resp.content_type == "application/json":
+                # Server ignored "stream" and sent the whole response
+                data = orjson.loads(await resp.read())
+                response = data["choices"][0]["message"]["content"]
+            else:
+                # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                last_update = loop.time()
+                async for raw_line in resp.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    event = line[5:].strip()
+                    if event == "[DONE]":
+                        break
+                    try:
+                        choices = orjson.loads(event).get("choices") or []
+                    except orjson.JSONDecodeError:
+                        continue
+                    if choices:
+                        response += choices[0].get("delta", {}).get("content") or ""
+
+                    # Throttle edits to stay within Discord's rate limit
+                    if response.strip() and loop.time() - last_update >= STREAM_EDIT_INTERVAL:
+                        await update_messages()
+                        last_update = loop.time()
+
+        if not response.strip():
+            await reply_msg.edit(content="Sorry, I encountered an error processing your request.")
+            print("Chat error: empty response from LLM")
+            return
+
+        await update_messages()
+    except Exception as e:
+        print(f"Chat error: {e}")
+        try:
+            if reply_msg is None:
+                await message.reply("Sorry, I encountered an error processing your request.")
+            elif shown == ["…"]:
+                await reply_msg.edit(content="Sorry, I encountered an error processing your request.")
+            else:
+                # Keep the partial answer the user is reading (with any text received
+                # since the last edit) and note the interruption after it
+                await update_messages()
+                note = "\n\n*(Sorry, the response was interrupted by an error.)*"
+                if len(shown[-1]) + len(note) <= 2000:
+                    await sent[-1].edit(content=shown[-1] + note)
+                else:
+                    await message.channel.send(note.strip())
+        except discord.HTTPException:
+            pass
+
+
+async def close_http_session():
+    """Close the shared LLM HTTP session."""
+    global aiohttp_session
+
+    if aiohttp_session and not aiohttp_session.closed:
+        await aiohttp_session.close()
+    aiohttp_session = None
 
 
 @client.event
 async def on_ready():
-    global channel_pairs, rag_manager
+    global channel_pairs, rag_manager, rag_flush_task, aiohttp_session, translate_batcher, _MENTION_TOKENS
 
     print(f"✓ Bot ready: {client.user}")
+    _MENTION_TOKENS = (f'<@{client.user.id}>', f'<@!{client.user.id}>')
 
-    # Initialize RAG manager
-    if RAG_ENABLED:
+    # Create shared HTTP session (on_ready also fires after reconnects, so only once)
+    if aiohttp_session is None or aiohttp_session.closed:
+        aiohttp_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=32, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=300)
+        )
+
+    # Start translation batcher
+    if TRANSLATE_BATCH_ENABLED:
+        if translate_batcher is None:
+            translate_batcher = TranslateBatcher(TRANSLATE_BATCH_MAX_SIZE, TRANSLATE_BATCH_WAIT_MS)
+        translate_batcher.start()
+
+    # Initialize RAG manager (kept across reconnects so unflushed changes survive)
+    if RAG_ENABLED and rag_manager is None:
         rag_manager = RAGManager(data_dir=RAG_DATA_DIR)
         print(f"✓ RAG enabled with data dir: {RAG_DATA_DIR}")
 
+    # Start periodic write-back of changed guild data
+    if rag_manager and (rag_flush_task is None or rag_flush_task.done()):
+        rag_flush_task = asyncio.create_task(rag_manager.flush_dirty(RAG_FLUSH_INTERVAL))
+
+    # Initialize semantic translation caches (kept across reconnects), sharing one model
+    if TRANSLATE_SEMANTIC_CACHE_ENABLED and not semantic_caches:
+        model = None
+        for direction in ("zh2en", "en2zh"):
+            cache = SemanticCache(
+                model_name=TRANSLATE_SEMANTIC_CACHE_MODEL,
+                threshold=TRANSLATE_SEMANTIC_CACHE_THRESHOLD,
+                max_entries=TRANSLATE_SEMANTIC_CACHE_SIZE,
+                persist_dir=RAG_DATA_DIR,
+                name=f"translate_cache_{direction}",
+                model=model
+            )
+            model = cache.model
+            semantic_caches[direction] = cache
+        print(f"✓ Semantic translation cache enabled (threshold: {TRANSLATE_SEMANTIC_CACHE_THRESHOLD})")
+
     # Build channel pairs for each guild
     for guild in client.guilds:
         print(f"✓ Connected to server: {guild.name}")
@@ -344,24 +826,31 @@ async def on_message(message):
         content = message.content
         if is_mentioned:
             # Remove the bot mention from the message
-            content = content.replace(f'<@{client.user.id}>', '').replace(f'<@!{client.user.id}>', '').strip()
-        else:
-            content = content.strip()
+            for token in _MENTION_TOKENS:
+                content = content.replace(token, '')
+        content = content.strip()
 
         if not content:
             return
 
         debug_log(f"Chat request from {message.author.name} in {message.channel}: {content}")
 
+        # Start retrieving context from RAG if enabled, so it runs while the
+        # typing indicator request is in flight
+        context_task = None
+        if RAG_ENABLED and not is_dm and rag_manager:
+            guild_id = message.guild.id
+            # Pass author's display name for query expansion (replaces "I", "my", etc.)
+            author_display_name = message.author.display_name
+            context_task = asyncio.create_task(
+                rag_manager.retrieve_context(guild_id, content, author_display_name)
+            )
+
         # Send typing indicator
         async with message.channel.typing():
-            # Retrieve context from RAG if enabled
             context_str = None
-            if RAG_ENABLED and not is_dm and rag_manager:
-                guild_id = message.guild.id
-                # Pass author's display name for query expansion (replaces "I", "my", etc.)
-                author_display_name = message.author.display_name
-                context_str = await rag_manager.retrieve_context(guild_id, content, author_display_name)
+            if context_task:
+                context_str = await context_task
                 if context_str:
                     debug_log(f"Retrieved RAG context for query")
 
@@ -376,49 +865,17 @@ async def on_message(message):
                 "model": LLM_MODEL,
                 "messages": messages,
                 "temperature": 0.7,
-                "max_tokens": 2000
+                "max_tokens": 2000,
+                "stream": True
             }
 
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(LLM_URL, json=payload) as resp:
-                        if resp.status == 200:
-                            data = await resp.json()
-                            response = data["choices"][0]["message"]["content"].strip()
-
-                            # Split long responses into multiple messages (Discord limit: 2000 chars)
-                            if len(response) <= 2000:
-                                await message.reply(response)
-                            else:
-                                # Split at newlines to avoid cutting mid-sentence
-                                chunks = []
-                                current_chunk = ""
-                                for line in response.split("\n"):
-                                    if len(current_chunk) + len(line) + 1 <= 2000:
-                                        current_chunk += line + "\n"
-                                    else:
-                                        if current_chunk:
-                                            chunks.append(current_chunk)
-                                        current_chunk = line + "\n"
-                                if current_chunk:
-                                    chunks.append(current_chunk)
-
-                                # Reply to first chunk, send rest as follow-ups
-                                await message.reply(chunks[0])
-                                for chunk in chunks[1:]:
-                                    await message.channel.send(chunk)
-                        else:
-                            await message.reply(f"Sorry, I encountered an error: HTTP {resp.status}")
-                            print(f"LLM API error: {resp.status}")
-            except Exception as e:
-                await message.reply("Sorry, I encountered an error processing your request.")
-                print(f"Chat error: {e}")
+            await stream_chat_response(message, payload)
 
         # Extract facts in background (non-blocking)
         if RAG_ENABLED and not is_dm and RAG_EXTRACTION_ENABLED and rag_manager:
             guild_id = message.guild.id
             # Check if this is a designated RAG channel
-            is_rag = rag_manager.is_rag_channel(message.channel.name, message.channel.topic)
+            is_rag = is_rag_channel(message.channel)
             asyncio.create_task(
                 rag_manager.extract_facts_from_message(message, content, is_rag_channel=is_rag)
             )
@@ -426,7 +883,7 @@ async def on_message(message):
 
     # Handle RAG channel messages (extract facts even without @mention)
     if RAG_ENABLED and RAG_CHANNEL_ENABLED and rag_manager:
-        if rag_manager.is_rag_channel(message.channel.name, message.channel.topic):
+        if is_rag_channel(message.channel):
             # Extract facts from RAG channel messages
             content = message.content.strip()
             if content and len(content) >= 2:
@@ -435,15 +892,17 @@ async def on_message(message):
                 # Chunk large messages with context preservation
                 chunks = await rag_manager.chunk_message_with_context(content)
 
-                print(f"[RAG] Processing {len(chunks)} chunk(s) sequentially to avoid server overload...")
+                print(f"[RAG] Processing {len(chunks)} chunk(s)...")
 
-                # Process chunks sequentially to avoid overwhelming LLM server
-                for i, chunk in enumerate(chunks, 1):
-                    try:
-                        print(f"[RAG] Processing chunk {i}/{len(chunks)}...")
-                        await rag_manager.extract_facts_from_message(message, chunk, is_rag_channel=True)
-                    except Exception as e:
-                        print(f"[RAG] Error processing chunk {i}/{len(chunks)}: {e}")
+                # Queue all chunks at once; the extraction worker batches them and
+                # sends one request at a time, so the LLM server isn't overwhelmed
+                results = await asyncio.gather(*(
+                    rag_manager.extract_facts_from_message(message, chunk, is_rag_channel=True)
+                    for chunk in chunks
+                ), return_exceptions=True)
+                for i, result in enumerate(results, 1):
+                    if isinstance(result, Exception):
+                        print(f"[RAG] Error processing chunk {i}/{len(chunks)}: {result}")
 
                 # React with ✅ to confirm fact was recorded
                 try:
@@ -472,8 +931,7 @@ async def on_message(message):
     if not content and message.attachments:
         debug_log(f"Media-only message in {message.channel.name}, forwarding attachments")
         # Send attachments directly without translation
-        for att in message.attachments:
-            await target_channel.send(att.url)
+        await forward_attachments(target_channel, message.attachments)
         return
 
     # Skip if no content at all
@@ -481,34 +939,40 @@ async def on_message(message):
         debug_log(f"Skipping short/empty message")
         return
 
-    # Detect language mismatch
-    channel_lang = get_channel_language(message.channel)
     message_lang = 'zh' if has_chinese(content) else 'en'
 
-    # If language doesn't match channel, add 🔄 reaction and skip
-    if channel_lang != message_lang:
-        debug_log(f"Language mismatch in {message.channel.name}: adding 🔄 reaction")
-        try:
-            await message.add_reaction("🔄")
-        except discord.errors.Forbidden:
-            print("Warning: Bot lacks permission to add reactions")
-        return
+    if should_translate(content):
+        # Detect language mismatch
+        channel_lang = get_channel_language(message.channel)
 
-    # Translate the content
-    start_time = time.time()
-    translation = await translate(content)
-    elapsed = time.time() - start_time
+        # If language doesn't match channel, add 🔄 reaction and skip
+        if channel_lang != message_lang:
+            debug_log(f"Language mismatch in {message.channel.name}: adding 🔄 reaction")
+            try:
+                await message.add_reaction("🔄")
+            except discord.errors.Forbidden:
+                print("Warning: Bot lacks permission to add reactions")
+            return
 
-    if not translation:
-        debug_log(f"Translation failed for message in {message.channel.name}")
-        return
+        # Translate the content
+        start_time = time.time()
+        translation = await translate(content)
+        elapsed = time.time() - start_time
+
+        if not translation:
+            debug_log(f"Translation failed for message in {message.channel.name}")
+            return
 
-    debug_log(f"Translated message from {message.channel.name} → {target_channel.name} ({elapsed:.2f}s)")
+        debug_log(f"Translated message from {message.channel.name} → {target_channel.name} ({elapsed:.2f}s)")
+    else:
+        # Links, emoji and mentions only: forward as-is without calling the LLM
+        debug_log(f"No translatable text in {message.channel.name}, forwarding as-is")
+        translation = content
 
     # Create embed with author info
     embed = discord.Embed(
         description=translation,
-        color=0x5865F2 if not has_chinese(content) else 0xED4245  # Blue for EN→CN, Red for CN→EN
+        color=0x5865F2 if message_lang == 'en' else 0xED4245  # Blue for EN→CN, Red for CN→EN
     )
 
     # Add author info with clickable link to original
@@ -522,12 +986,11 @@ async def on_message(message):
     translation_msg = await target_channel.send(embed=embed)
 
     # Store message mapping for edit tracking
-    message_mappings[message.id] = translation_msg.id
+    remember_message(message_mappings, message.id, translation_msg.id)
 
     # Send attachments as separate messages (for messages with both text and images)
     if message.attachments:
-        for att in message.attachments:
-            await target_channel.send(att.url)
+        await forward_attachments(target_channel, message.attachments)
 
 
 @client.event
@@ -578,29 +1041,34 @@ async def on_message_edit(before, after):
         debug_log(f"Edited message has no content, skipping")
         return
 
-    # Check language mismatch
-    channel_lang = get_channel_language(after.channel)
     message_lang = 'zh' if has_chinese(content) else 'en'
 
-    if channel_lang != message_lang:
-        debug_log(f"Edited message has language mismatch, not updating translation")
-        return
+    if should_translate(content):
+        # Check language mismatch
+        channel_lang = get_channel_language(after.channel)
 
-    # Translate the new content
-    start_time = time.time()
-    translation = await translate(content)
-    elapsed = time.time() - start_time
+        if channel_lang != message_lang:
+            debug_log(f"Edited message has language mismatch, not updating translation")
+            return
 
-    if not translation:
-        debug_log(f"Translation failed for edited message in {after.channel.name}")
-        return
+        # Translate the new content
+        start_time = time.time()
+        translation = await translate(content)
+        elapsed = time.time() - start_time
+
+        if not translation:
+            debug_log(f"Translation failed for edited message in {after.channel.name}")
+            return
 
-    debug_log(f"Updated translation for edited message in {after.channel.name} ({elapsed:.2f}s)")
+        debug_log(f"Updated translation for edited message in {after.channel.name} ({elapsed:.2f}s)")
+    else:
+        # Links, emoji and mentions only: show as-is without calling the LLM
+        translation = content
 
     # Update the embed
     embed = discord.Embed(
         description=translation,
-        color=0x5865F2 if not has_chinese(content) else 0xED4245
+        color=0x5865F2 if message_lang == 'en' else 0xED4245
     )
 
     # Add author info with clickable link to original
@@ -639,9 +1107,9 @@ async def on_reaction_add(reaction, user):
         debug_log(f"Message {message.id} already translated, skipping")
         return
 
-    # Skip if message has no content
+    # Skip if message has no content, or nothing worth translating
     content = message.content.strip()
-    if not content or len(content) < 2:
+    if not content or len(content) < 2 or not should_translate(content):
         return
 
     debug_log(f"🔄 reaction on message in {message.channel.name} by {user.name}")
@@ -656,13 +1124,24 @@ async def on_reaction_add(reaction, user):
         return
 
     # Mark as translated
-    translated_messages.add(message.id)
+    remember_message(translated_messages, message.id)
 
     # Reply with simple translation (not full embed for in-channel)
     await message.reply(translation, mention_author=False)
     debug_log(f"Translated via reaction: {message.channel.name} ({elapsed:.2f}s)")
 
 
+@client.event
+async def on_guild_channel_update(before, after):
+    """Forget cached channel checks when a channel's name or topic may have changed."""
+    _rag_channel_cache.pop(after.id, None)
+
+
+@client.event
+async def on_guild_channel_delete(channel):
+    _rag_channel_cache.pop(channel.id, None)
+
+
 @client.event
 async def on_raw_message_update(payload: discord.RawMessageUpdateEvent):
     """Handle message updates, including pin events."""
@@ -706,12 +1185,12 @@ async def on_raw_message_update(payload: discord.RawMessageUpdateEvent):
     # Chunk if needed and extract facts (marked as verified)
     chunks = await rag_manager.chunk_message_with_context(content)
 
-    for i, chunk in enumerate(chunks, 1):
-        if len(chunks) > 1:
-            print(f"[RAG] Processing pinned chunk {i}/{len(chunks)}...")
-        await rag_manager.extract_facts_from_message(
-            message, chunk, is_rag_channel=True  # Treat as verified
-        )
+    if len(chunks) > 1:
+        print(f"[RAG] Processing {len(chunks)} pinned chunks...")
+    await asyncio.gather(*(
+        rag_manager.extract_facts_from_message(message, chunk, is_rag_channel=True)  # Treat as verified
+        for chunk in chunks
+    ))
 
     # Add reaction to confirm extraction (same as RAG channel)
     try:
@@ -720,5 +1199,34 @@ async def on_raw_message_update(payload: discord.RawMessageUpdateEvent):
         pass
 
 
+async def main():
+    # Docker stops containers with SIGTERM; close the client so cleanup below runs
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, lambda: asyncio.create_task(client.close())
+        )
+    except NotImplementedError:
+        pass  # Signal handlers are unavailable on Windows event loops
+
+    async with client:
+        try:
+            await client.start(DISCORD_TOKEN)
+        finally:
+            if translate_batcher:
+                await translate_batcher.stop()
+            if rag_flush_task:
+                rag_flush_task.cancel()
+            if rag_manager:
+                rag_manager.flush_all()
+                await rag_manager.close()
+            await close_http_session()
+            for cache in semantic_caches.values():
+                cache.save()
+
+
 if __name__ == "__main__":
-    client.run(DISCORD_TOKEN)
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,25 @@
 #!/usr/bin/env python3
 """Check RAG database contents including vector database."""
 
+import argparse
+import itertools
 import json
 import os
-import glob
+import sys
+
+# Streaming JSON parser (falls back to loading whole files)
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Faster whole-file JSON parsing for the fallback path
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Vector database support
 try:
@@ -17,95 +33,259 @@ except ImportError:
 data_dir = os.environ.get("RAG_DATA_DIR", "/data")
 RAG_VECTOR_ENABLED = os.environ.get("RAG_VECTOR_ENABLED", "true").lower() == "true"
 
-print("=" * 60)
-print("RAG Database Contents")
-print("=" * 60)
+# Read guild files in large chunks to cut down on read syscalls
+READ_BUFFER_SIZE = 1 << 20
+
+# Facts formatted per stdout write (keeps output buffered without holding a whole guild)
+FACTS_PER_WRITE = 500
+
+# Append log that holds a guild's facts until they're compacted into its JSON file
+SIDECAR_SUFFIX = ".facts.jsonl"
+
+
+def sidecar_path_for(file_path):
+    """Path of the append log that belongs to a guild JSON file."""
+    return file_path[:-len(".json")] + SIDECAR_SUFFIX
+
+
+def find_guild_files(data_dir, guild_id=None):
+    """List guild JSON file paths in data_dir, optionally only one guild's.
+
+    A guild whose facts are only in its append log so far (never compacted)
+    is listed by the JSON path it will be compacted to, even though that
+    file doesn't exist yet.
+    """
+    if not os.path.isdir(data_dir):
+        return []
+
+    # A single guild's file name is known, so there's no need to list the directory
+    if guild_id is not None:
+        file_path = os.path.join(data_dir, f"guild_{guild_id}.json")
+        if os.path.isfile(file_path) or os.path.isfile(sidecar_path_for(file_path)):
+            return [file_path]
+        return []
+
+    # scandir entries carry their file type, so no extra stat per file
+    file_paths = set()
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if not entry.name.startswith("guild_") or not entry.is_file():
+                continue
+            if entry.name.endswith(SIDECAR_SUFFIX):
+                file_paths.add(entry.path[:-len(SIDECAR_SUFFIX)] + ".json")
+            elif entry.name.endswith(".json"):
+                file_paths.add(entry.path)
+    return sorted(file_paths)
+
+
+def guild_id_from_path(file_path):
+    """Guild ID taken from a guild_<id>.json file name."""
+    return os.path.basename(file_path)[len("guild_"):-len(".json")]
+
+
+def load_guild_file(file_path):
+    """Load a whole guild file."""
+    with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        if ORJSON_AVAILABLE:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+
+def scan_guild_file(file_path):
+    """Read guild header fields, fact counts and fact IDs without loading every fact."""
+    if not IJSON_AVAILABLE:
+        data = load_guild_file(file_path)
+        facts = data.get("facts", [])
+        verified_count = sum(1 for fact in facts if fact.get("verified", False))
+        fact_ids = {fact.get("id") for fact in facts}
+        return data.get("guild_id", "unknown"), data.get("last_updated", "unknown"), len(facts), verified_count, fact_ids
+
+    guild_id = "unknown"
+    last_updated = "unknown"
+    fact_count = 0
+    verified_count = 0
+    fact_ids = set()
+    with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == "facts.item" and event == "start_map":
+                fact_count += 1
+            elif prefix == "facts.item.verified" and value is True:
+                verified_count += 1
+            elif prefix == "facts.item.id":
+                fact_ids.add(value)
+            elif prefix == "guild_id":
+                guild_id = value
+            elif prefix == "last_updated":
+                last_updated = value
+    return guild_id, last_updated, fact_count, verified_count, fact_ids
+
+
+def iter_facts(file_path):
+    """Yield facts from a guild file one at a time."""
+    if not IJSON_AVAILABLE:
+        yield from load_guild_file(file_path).get("facts", [])
+        return
 
-# Find all guild JSON files
-guild_files = glob.glob(os.path.join(data_dir, "guild_*.json"))
+    with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        yield from ijson.items(f, "facts.item", use_float=True)
 
-if not guild_files:
-    print("\nNo guild data files found!")
-    exit(0)
 
-for file_path in guild_files:
-    print(f"\nFile: {file_path}")
+def iter_pending_facts(file_path, known_ids):
+    """Yield facts from a guild's .facts.jsonl log that aren't compacted into file_path yet."""
+    sidecar_path = sidecar_path_for(file_path)
+    if not os.path.exists(sidecar_path):
+        return
+
+    # One fact per line, so only the current line is ever held in memory
+    with open(sidecar_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                fact = orjson.loads(line) if ORJSON_AVAILABLE else json.loads(line)
+            except ValueError:
+                continue  # Torn line from an interrupted append
+            if fact.get("id") not in known_ids:
+                yield fact
+
+
+def print_guild_file(file_path):
+    """Print the header, counts and facts of one guild file."""
+    compacted = os.path.exists(file_path)
+    print(f"\nFile: {file_path if compacted else sidecar_path_for(file_path)}")
     print("-" * 60)
 
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-
-        guild_id = data.get("guild_id", "unknown")
-        fact_count = len(data.get("facts", []))
+        # Pass 1: header and counts (including facts still in the append log)
+        if compacted:
+            guild_id, last_updated, fact_count, verified_count, fact_ids = scan_guild_file(file_path)
+        else:
+            # Only the append log exists yet, so the header comes from it alone
+            guild_id, last_updated, fact_count, verified_count, fact_ids = (
+                guild_id_from_path(file_path), "unknown", 0, 0, set()
+            )
+        pending_count = 0
+        latest_created = None
+        for fact in iter_pending_facts(file_path, fact_ids):
+            pending_count += 1
+            if fact.get("verified", False):
+                verified_count += 1
+            created_at = fact.get("created_at")
+            if created_at and (latest_created is None or created_at > latest_created):
+                latest_created = created_at
+        fact_count += pending_count
+        if not compacted and latest_created:
+            last_updated = latest_created
 
         print(f"Guild ID: {guild_id}")
         print(f"Total Facts: {fact_count}")
-        print(f"Last Updated: {data.get('last_updated', 'unknown')}")
+        if pending_count:
+            print(f"Not yet compacted: {pending_count}")
+        print(f"Last Updated: {last_updated}")
         print()
 
         # Count verified vs unverified
-        verified_count = sum(1 for f in data.get("facts", []) if f.get("verified", False))
         unverified_count = fact_count - verified_count
         print(f"Verified facts: {verified_count}")
         print(f"Unverified facts: {unverified_count}")
         print()
 
-        # Print each fact
-        for i, fact in enumerate(data.get("facts", []), 1):
+        # Pass 2: print each fact
+        compacted_facts = iter_facts(file_path) if compacted else ()
+        all_facts = itertools.chain(compacted_facts, iter_pending_facts(file_path, fact_ids))
+        parts = []
+        for i, fact in enumerate(all_facts, 1):
             verified_icon = "✅" if fact.get("verified", False) else "❌"
-            print(f"Fact #{i} {verified_icon}:")
-            print(f"  Content: {fact.get('content', 'N/A')}")
-            print(f"  Category: {fact.get('category', 'N/A')}")
-            print(f"  Keywords: {', '.join(fact.get('keywords', []))}")
-            print(f"  Confidence: {fact.get('confidence', 0.0):.2f}")
-            print(f"  Verified: {fact.get('verified', False)}")
-            print(f"  Source: #{fact.get('extracted_from', {}).get('channel_name', 'unknown')}")
-            print()
+            parts.append(
+                f"Fact #{i} {verified_icon}:\n"
+                f"  Content: {fact.get('content', 'N/A')}\n"
+                f"  Category: {fact.get('category', 'N/A')}\n"
+                f"  Keywords: {', '.join(fact.get('keywords', []))}\n"
+                f"  Confidence: {fact.get('confidence', 0.0):.2f}\n"
+                f"  Verified: {fact.get('verified', False)}\n"
+                f"  Source: #{fact.get('extracted_from', {}).get('channel_name', 'unknown')}\n"
+                f"\n"
+            )
+            if len(parts) >= FACTS_PER_WRITE:
+                sys.stdout.write("".join(parts))
+                parts.clear()
+        sys.stdout.write("".join(parts))
 
     except Exception as e:
         print(f"Error reading {file_path}: {e}")
 
-# Vector Database Stats
-print()
-print("=" * 60)
-print("Vector Database Stats")
-print("=" * 60)
-
-if not CHROMA_AVAILABLE:
-    print("\nChromaDB not installed - vector search unavailable")
-elif not RAG_VECTOR_ENABLED:
-    print("\nVector search disabled (RAG_VECTOR_ENABLED=false)")
-else:
-    try:
-        chroma_path = os.path.join(data_dir, "chroma")
-        if os.path.exists(chroma_path):
-            chroma_client = chromadb.PersistentClient(
-                path=chroma_path,
-                settings=Settings(anonymized_telemetry=False)
-            )
 
-            collections = chroma_client.list_collections()
-            print(f"\nChroma DB path: {chroma_path}")
-            print(f"Total collections: {len(collections)}")
-
-            for collection in collections:
-                count = collection.count()
-                print(f"\n  Collection: {collection.name}")
-                print(f"    Vector count: {count}")
-
-                # Show sample if not empty
-                if count > 0:
-                    sample = collection.peek(limit=3)
-                    if sample["documents"]:
-                        print(f"    Sample documents:")
-                        for doc in sample["documents"][:3]:
-                            preview = doc[:60] + "..." if len(doc) > 60 else doc
-                            print(f"      - {preview}")
-        else:
-            print(f"\nNo ChromaDB data found at {chroma_path}")
-    except Exception as e:
-        print(f"\nError accessing ChromaDB: {e}")
+def print_vector_stats(chroma_client, chroma_path, guild_id=None, verbose=False):
+    """Print collection counts (and sample documents if verbose) from a ChromaDB client."""
+    collections = chroma_client.list_collections()
+    if guild_id:
+        collections = [c for c in collections if c.name == f"guild_{guild_id}"]
+
+    print(f"\nChroma DB path: {chroma_path}")
+    print(f"Total collections: {len(collections)}")
+
+    for collection in collections:
+        count = collection.count()
+        print(f"\n  Collection: {collection.name}")
+        print(f"    Vector count: {count}")
+
+        # Show sample if not empty
+        if verbose and count > 0:
+            sample = collection.peek(limit=3)
+            if sample["documents"]:
+                print(f"    Sample documents:")
+                for doc in sample["documents"][:3]:
+                    preview = doc[:60] + "..." if len(doc) > 60 else doc
+                    print(f"      - {preview}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check RAG database contents including vector database.")
+    parser.add_argument("--guild-id", help="Only show data for this guild")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show sample documents from the vector database")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("RAG Database Contents")
+    print("=" * 60)
+
+    # Find guild JSON files
+    guild_files = find_guild_files(data_dir, args.guild_id)
+
+    if not guild_files:
+        print("\nNo guild data files found!")
+        return
+
+    for file_path in guild_files:
+        print_guild_file(file_path)
+
+    # Vector Database Stats
+    print()
+    print("=" * 60)
+    print("Vector Database Stats")
+    print("=" * 60)
+
+    if not CHROMA_AVAILABLE:
+        print("\nChromaDB not installed - vector search unavailable")
+    elif not RAG_VECTOR_ENABLED:
+        print("\nVector search disabled (RAG_VECTOR_ENABLED=false)")
+    else:
+        try:
+            chroma_path = os.path.join(data_dir, "chroma")
+            if os.path.exists(chroma_path):
+                chroma_client = chromadb.PersistentClient(
+                    path=chroma_path,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+                print_vector_stats(chroma_client, chroma_path, args.guild_id, args.verbose)
+            else:
+                print(f"\nNo ChromaDB data found at {chroma_path}")
+        except Exception as e:
+            print(f"\nError accessing ChromaDB: {e}")
+
+    print()
+    print("=" * 60)
+
 
-print()
-print("=" * 60)
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,18 @@ import re
 import json
 import asyncio
 import aiohttp
-from typing import Dict, List, Optional, Set
-from datetime import datetime
-from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+from collections import Counter, OrderedDict
 import uuid
 
+# Fast JSON for guild files (falls back to the stdlib json module)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Vector database imports
 import chromadb
 from chromadb.config import Settings
@@ -30,13 +37,21 @@ RAG_CHUNK_THRESHOLD = int(os.environ.get("RAG_CHUNK_THRESHOLD", "2000"))
 RAG_CHUNK_MAX_SIZE = int(os.environ.get("RAG_CHUNK_MAX_SIZE", "500"))
 RAG_VECTOR_ENABLED = os.environ.get("RAG_VECTOR_ENABLED", "true").lower() == "true"
 RAG_EMBEDDING_MODEL = os.environ.get("RAG_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+RAG_FLUSH_INTERVAL = float(os.environ.get("RAG_FLUSH_INTERVAL", "5"))
+RAG_DURABLE_WRITES = os.environ.get("RAG_DURABLE_WRITES", "false").lower() == "true"
+RAG_CACHE_SIZE = int(os.environ.get("RAG_CACHE_SIZE", "128"))
+RAG_EXTRACTION_BATCH_SIZE = int(os.environ.get("RAG_EXTRACTION_BATCH_SIZE", "8"))
+RAG_EXTRACTION_BATCH_WAIT_MS = int(os.environ.get("RAG_EXTRACTION_BATCH_WAIT_MS", "200"))
+
+# Max keyword-search results kept for repeated queries
+RETRIEVAL_CACHE_SIZE = 256
 
 # LLM Configuration (reuse from main bot)
 LLM_URL = os.environ.get("LLM_URL", "http://localhost:8080/v1/chat/completions")
 LLM_MODEL = os.environ.get("LLM_MODEL", "qwen")
 
 # Stopwords for keyword extraction
-STOPWORDS = {
+STOPWORDS = frozenset({
     "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
     "of", "with", "by", "from", "as", "is", "was", "are", "were", "be",
     "been", "being", "have", "has", "had", "do", "does", "did", "will",
@@ -44,7 +59,94 @@ STOPWORDS = {
     "where", "who", "how", "why", "which", "this", "that", "these", "those",
     "i", "you", "he", "she", "it", "we", "they", "my", "your", "his", "her",
     "its", "our", "their"
-}
+})
+
+# Precompiled patterns (RAG_CHANNEL_PATTERN is read from the environment once at import)
+_TOKEN_RE = re.compile(r'\w+')
+_RAG_TOPIC_RE = re.compile(r'rag:\s*true', re.IGNORECASE)
+_CHANNEL_NAME_RE = re.compile(RAG_CHANNEL_PATTERN, re.IGNORECASE)
+
+# A pattern that is just a|b|c of literal words is checked with substring tests
+# instead of the regex; anything else (custom regex syntax) keeps using the regex
+_CHANNEL_KEYWORDS = tuple(k.lower() for k in RAG_CHANNEL_PATTERN.split('|'))
+if not all(re.escape(k) == k for k in _CHANNEL_KEYWORDS):
+    _CHANNEL_KEYWORDS = None
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+_JSON_STRING_ARRAY_RE = re.compile(r'\[\s*".*\]\s*$', re.DOTALL)
+
+# First-person patterns for query expansion, with replacement templates ({name} = author)
+_FIRST_PERSON_PATTERNS = [
+    (re.compile(r'\bdo I\b', re.IGNORECASE), 'does {name}'),  # "where do I" -> "where does {name}"
+    (re.compile(r'\bam I\b', re.IGNORECASE), 'is {name}'),    # "am I" -> "is {name}"
+    (re.compile(r'\bwas I\b', re.IGNORECASE), 'was {name}'),  # "was I" -> "was {name}"
+    (re.compile(r'\bhave I\b', re.IGNORECASE), 'has {name}'),  # "have I" -> "has {name}"
+    (re.compile(r'\bcan I\b', re.IGNORECASE), 'can {name}'),  # "can I" -> "can {name}"
+    (re.compile(r'\bwill I\b', re.IGNORECASE), 'will {name}'),  # "will I" -> "will {name}"
+    (re.compile(r'\bdid I\b', re.IGNORECASE), 'did {name}'),  # "did I" -> "did {name}"
+    (re.compile(r'\bI\b'), '{name}'),  # Standalone "I" at word boundary -> "{name}"
+    (re.compile(r'\bmy\b', re.IGNORECASE), "{name}'s"),  # "my" -> "{name}'s"
+    (re.compile(r'\bme\b', re.IGNORECASE), '{name}'),  # "me" -> "{name}"
+    (re.compile(r'\bmine\b', re.IGNORECASE), "{name}'s"),  # "mine" -> "{name}'s"
+]
+
+# Fact extraction prompts (single message, and several numbered messages per request)
+_EXTRACTION_RULES = """Each fact should have:
+- content: The fact as a complete sentence
+- category: One of [birthday, location, contact, preference, general]
+- confidence: A score from 0 to 1 indicating your confidence in the fact
+- keywords: Array of searchable keywords (lowercase, no stopwords). IMPORTANT: Always include person names, places, and other entity names as keywords!
+- entities: Object with extracted entities (e.g., {"person": "John Smith", "date": "May 15, 1990"})
+
+CRITICAL RULES:
+1. ALWAYS preserve FULL NAMES (first AND last name) when available. Never shorten to just first name.
+   - "Cameron River's address is 123 Main St" - CORRECT
+   - "Cameron's address is 123 Main St" - WRONG (missing last name)
+
+2. Replace first-person pronouns (I, me, my, mine) with the author's name.
+   - If author is "Cameron" and message is "I live in Seattle":
+   - content should be: "Cameron lives in Seattle"
+
+3. When extracting from structured contact data, preserve the full name for EACH fact.
+   - Input: "John Smith - Birthday: Jan 1 - Email: john@email.com"
+   - Output facts should be: "John Smith's birthday is Jan 1", "John Smith's email is john@email.com"
+   - NOT: "John's birthday is Jan 1" (missing last name)
+
+4. Include full names (all parts) in keywords.
+   - keywords should be: ["john", "smith", "birthday", "jan"]
+   - NOT just: ["john", "birthday", "jan"]
+"""
+
+_EXTRACTION_PROMPT = f"""Extract factual information from the following message. Return ONLY a JSON array of facts.
+{_EXTRACTION_RULES}
+Return [] if no facts are found. Do not include conversational or hypothetical statements."""
+
+_BATCH_EXTRACTION_PROMPT = f"""Extract factual information from each of the following numbered messages. Return ONLY a JSON array with exactly one entry per message, in order; each entry is a JSON array of that message's facts.
+{_EXTRACTION_RULES.replace("with the author's name.", "with that message's author's name.")}
+Use [] for a message with no facts. Do not include conversational or hypothetical statements."""
+
+
+# orjson only handles 64-bit integers (and reads larger ones back as floats)
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _stringify_big_ints(value):
+    """Replace integers outside the 64-bit range with their decimal strings.
+
+    LLM output is parsed with json.loads, so long numbers in a fact (card or
+    account numbers) arrive as big ints; as strings they round-trip intact.
+    """
+    if isinstance(value, dict):
+        return {k: _stringify_big_ints(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_stringify_big_ints(v) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool) and not _INT64_MIN <= value <= _INT64_MAX:
+        return str(value)
+    return value
+
+
+def _utcnow_iso() -> str:
+    """Current UTC time as an ISO 8601 string with a Z suffix."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
 
 
 class RAGManager:
@@ -53,7 +155,29 @@ class RAGManager:
     def __init__(self, data_dir: str = RAG_DATA_DIR):
         self.data_dir = data_dir
         self.cache: OrderedDict[str, Dict] = OrderedDict()
-        self.cache_size = 10
+        self.cache_size = max(1, RAG_CACHE_SIZE)
+        # Per cached guild: inverted keyword index (keyword -> indices into data["facts"])
+        # and each fact's keyword set, parallel to data["facts"]
+        self._indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._fact_sets: Dict[str, List[Set[str]]] = {}
+        # Exact keyword sets per cached guild, for O(1) rejection of exact duplicates
+        self._kw_signatures: Dict[str, Set[frozenset]] = {}
+        # Keyword-search results keyed by (guild, sorted query keywords, facts version);
+        # the version is bumped whenever a guild's facts change, retiring old entries
+        self._facts_version: Dict[str, int] = {}
+        self._retrieval_cache: OrderedDict[tuple, List[Dict]] = OrderedDict()
+        # Guilds changed in memory but not yet written
+        self._dirty: Set[str] = set()
+        # Serialized form of each cached guild's facts, one line per fact, so a
+        # write only serializes facts added since the last one
+        self._fact_blobs: Dict[str, Tuple[List[Dict], List[bytes]]] = {}
+
+        # Shared HTTP session for LLM calls (created on first use, inside the event loop)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Messages waiting for batched fact extraction, and the worker draining them
+        self._extract_queue: asyncio.Queue = asyncio.Queue()
+        self._extract_task: Optional[asyncio.Task] = None
 
         # Ensure data directory exists
         os.makedirs(data_dir, exist_ok=True)
@@ -75,10 +199,130 @@ class RAGManager:
             self.embedding_model = None
             self.chroma_client = None
 
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+            )
+        return self._session
+
+    async def close(self):
+        """Stop the extraction worker and close the shared HTTP session."""
+        if self._extract_task:
+            self._extract_task.cancel()
+            try:
+                await self._extract_task
+            except asyncio.CancelledError:
+                pass
+            self._extract_task = None
+
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     def _get_guild_file(self, guild_id: int) -> str:
         """Get the file path for a guild's data."""
         return os.path.join(self.data_dir, f"guild_{guild_id}.json")
 
+    def _get_sidecar_file(self, guild_id: int) -> str:
+        """Get the path of a guild's append-only log of facts not yet compacted."""
+        return os.path.join(self.data_dir, f"guild_{guild_id}.facts.jsonl")
+
+    def _append_fact(self, guild_id: int, fact_entry: Dict) -> bool:
+        """Append one new fact to the guild's JSONL sidecar.
+
+        Returns False if the fact can't be serialized (and so must not be
+        stored). A failed write is only logged; the next compaction writes the fact.
+        """
+        try:
+            line = self._dumps(fact_entry) + b'\n'
+        except (TypeError, ValueError) as e:
+            print(f"[RAG] Skipping fact that can't be serialized for guild {guild_id}: {e}")
+            return False
+
+        try:
+            with open(self._get_sidecar_file(guild_id), 'ab') as f:
+                f.write(line)
+                if RAG_DURABLE_WRITES:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except IOError as e:
+            print(f"Error appending fact for guild {guild_id}: {e}")
+        return True
+
+    def _merge_sidecar(self, guild_id: int, data: Dict) -> int:
+        """Add facts from the guild's sidecar that the main file doesn't have yet.
+
+        Returns the number of facts merged.
+        """
+        sidecar_path = self._get_sidecar_file(guild_id)
+        if not os.path.exists(sidecar_path):
+            return 0
+
+        facts = data.setdefault("facts", [])
+        known_ids = {fact.get("id") for fact in facts}
+        categories = data.setdefault("metadata", {}).setdefault("categories", {})
+        merged = 0
+        line = b''
+
+        try:
+            with open(sidecar_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        fact = orjson.loads(line) if ORJSON_AVAILABLE else json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-append
+                        print(f"[RAG] Skipping unreadable line in {sidecar_path}")
+                        continue
+                    if fact.get("id") in known_ids:
+                        continue  # Already compacted into the main file
+                    known_ids.add(fact.get("id"))
+                    facts.append(fact)
+                    category = fact.get("category", "general")
+                    categories[category] = categories.get(category, 0) + 1
+                    merged += 1
+
+            # Terminate a torn last line so the next append starts on a fresh line
+            if line and not line.endswith(b'\n'):
+                with open(sidecar_path, 'ab') as f:
+                    f.write(b'\n')
+        except IOError as e:
+            print(f"Error reading fact log for guild {guild_id}: {e}")
+
+        if merged:
+            data["metadata"]["total_facts"] = len(facts)
+        return merged
+
+    def _index_guild(self, guild_key: str, facts: List[Dict]):
+        """Build the inverted keyword index and keyword sets for a guild's facts."""
+        index: Dict[str, List[int]] = {}
+        fact_sets = [set(fact.get("keywords", ())) for fact in facts]
+        for i, keywords in enumerate(fact_sets):
+            for kw in keywords:
+                index.setdefault(kw, []).append(i)
+        self._indexes[guild_key] = index
+        self._fact_sets[guild_key] = fact_sets
+        self._kw_signatures[guild_key] = {frozenset(keywords) for keywords in fact_sets if keywords}
+        self._bump_facts_version(guild_key)
+
+    def _bump_facts_version(self, guild_key: str):
+        """Invalidate cached search results for a guild."""
+        self._facts_version[guild_key] = self._facts_version.get(guild_key, 0) + 1
+
+    def _index_fact(self, guild_key: str, fact_idx: int, keywords: Set[str]):
+        """Add a newly appended fact to its guild's keyword index."""
+        index = self._indexes.get(guild_key)
+        if index is None:
+            return
+        for kw in keywords:
+            index.setdefault(kw, []).append(fact_idx)
+        if keywords:
+            self._kw_signatures[guild_key].add(frozenset(keywords))
+        self._bump_facts_version(guild_key)
+
     def load_guild_data(self, guild_id: int) -> Dict:
         """Load guild data from JSON file with LRU caching."""
         guild_key = str(guild_id)
@@ -96,7 +340,7 @@ class RAGManager:
             # Create new guild data
             data = {
                 "guild_id": str(guild_id),
-                "last_updated": datetime.utcnow().isoformat() + "Z",
+                "last_updated": _utcnow_iso(),
                 "facts": [],
                 "metadata": {
                     "total_facts": 0,
@@ -106,9 +350,13 @@ class RAGManager:
             }
         else:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
+                if ORJSON_AVAILABLE:
+                    with open(file_path, 'rb') as f:
+                        data = orjson.loads(f.read())
+                else:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+            except (ValueError, IOError) as e:
                 print(f"Error loading guild {guild_id} data: {e}")
                 # Backup corrupted file
                 backup_path = f"{file_path}.backup"
@@ -118,7 +366,7 @@ class RAGManager:
                 # Create new data
                 data = {
                     "guild_id": str(guild_id),
-                    "last_updated": datetime.utcnow().isoformat() + "Z",
+                    "last_updated": _utcnow_iso(),
                     "facts": [],
                     "metadata": {
                         "total_facts": 0,
@@ -127,56 +375,191 @@ class RAGManager:
                     }
                 }
 
-        # Add to cache
-        self.cache[guild_key] = data
-        self.cache.move_to_end(guild_key)
+        # Replay facts appended since the last compaction
+        merged = self._merge_sidecar(guild_id, data)
 
-        # Evict oldest if cache is full
-        if len(self.cache) > self.cache_size:
-            self.cache.popitem(last=False)
+        # Add to cache (a new key goes in at the end, already most recently used)
+        self._make_room()
+        self.cache[guild_key] = data
+        self._index_guild(guild_key, data.get("facts", []))
+        if merged:
+            print(f"[RAG] Merged {merged} uncompacted fact(s) for guild {guild_id}")
+            self._dirty.add(guild_key)
 
         return data
 
-    def save_guild_data(self, guild_id: int, data: Dict):
-        """Save guild data to JSON file with atomic write."""
-        file_path = self._get_guild_file(guild_id)
-        temp_path = f"{file_path}.tmp"
+    def _make_room(self):
+        """Evict least recently used guilds until one more fits in the cache.
+
+        Pending writes are flushed first, then the guild's index and serialized
+        facts go with it (compacting repopulates the serialized facts).
+        """
+        while len(self.cache) >= self.cache_size:
+            evicted_key, evicted_data = self.cache.popitem(last=False)
+            if evicted_key in self._dirty:
+                self._compact_logged(int(evicted_key), evicted_data)
+            self._indexes.pop(evicted_key, None)
+            self._fact_sets.pop(evicted_key, None)
+            self._kw_signatures.pop(evicted_key, None)
+            self._fact_blobs.pop(evicted_key, None)
+
+    def mark_dirty(self, guild_id: int, data: Dict):
+        """Update guild data in memory and schedule it for the next flush."""
+        guild_key = str(guild_id)
 
         # Update timestamp
-        data["last_updated"] = datetime.utcnow().isoformat() + "Z"
+        data["last_updated"] = _utcnow_iso()
 
-        try:
-            # Write to temp file
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        # Update cache (rebuild the index if this isn't the cached object)
+        if self.cache.get(guild_key) is not data or guild_key not in self._indexes:
+            self._index_guild(guild_key, data.get("facts", []))
+        if guild_key in self.cache:
+            self.cache.move_to_end(guild_key)
+        else:
+            self._make_room()
+        self.cache[guild_key] = data
 
-            # Atomic rename
-            os.replace(temp_path, file_path)
+        self._dirty.add(guild_key)
 
-            # Update cache
-            guild_key = str(guild_id)
-            self.cache[guild_key] = data
-            self.cache.move_to_end(guild_key)
-        except IOError as e:
+    def _flush_guild_data(self, guild_id: int, data: Dict):
+        """Write guild data to its JSON file with atomic write."""
+        guild_key = str(guild_id)
+        file_path = self._get_guild_file(guild_id)
+        temp_path = f"{file_path}.tmp"
+
+        try:
+            blob = self._serialize_guild(guild_key, data)
+            if RAG_DURABLE_WRITES:
+                self._write_durable(file_path, temp_path, blob)
+            else:
+                self._write_fast(file_path, temp_path, blob)
+
+            self._dirty.discard(guild_key)
+        except (IOError, TypeError, ValueError) as e:
             print(f"Error saving guild {guild_id} data: {e}")
             if os.path.exists(temp_path):
                 os.remove(temp_path)
 
+    def _dumps(self, obj, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 JSON bytes, optionally indented by 2 spaces."""
+        if ORJSON_AVAILABLE:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            try:
+                return orjson.dumps(obj, option=option)
+            except TypeError:
+                pass  # e.g. an integer beyond 64 bits; the stdlib handles those
+        return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+    def _serialize_guild(self, guild_key: str, data: Dict) -> bytes:
+        """Serialize guild data with the facts array written one fact per line.
+
+        Stored facts are never modified, only appended, so each fact's line is
+        kept and reused; only facts added since the last write are serialized.
+        The serialized lines are reset if the facts list itself is replaced.
+        """
+        facts = data.get("facts", [])
+        cached = self._fact_blobs.get(guild_key)
+        if cached is None or cached[0] is not facts or len(cached[1]) > len(facts):
+            cached = (facts, [])
+            self._fact_blobs[guild_key] = cached
+        fact_blobs = cached[1]
+        for fact in facts[len(fact_blobs):]:
+            fact_blobs.append(b'    ' + self._dumps(fact))
+
+        # Everything but the facts is small, so it is serialized in full (indented)
+        header = self._dumps({k: v for k, v in data.items() if k != "facts"}, indent=True)
+        if fact_blobs:
+            facts_blob = b'"facts": [\n' + b',\n'.join(fact_blobs) + b'\n  ]'
+        else:
+            facts_blob = b'"facts": []'
+        if header == b'{}':
+            return b'{\n  ' + facts_blob + b'\n}'
+        return header[:-2] + b',\n  ' + facts_blob + b'\n}'
+
+    def _write_fast(self, file_path: str, temp_path: str, blob: bytes):
+        """Write to a temp file, then atomic rename, leaving flushing to the OS.
+
+        A crash can lose the latest write, but never leaves a half-written file.
+        """
+        with open(temp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(temp_path, file_path)
+
+    def _write_durable(self, file_path: str, temp_path: str, blob: bytes):
+        """Write to a temp file, fsync it, atomic rename, then fsync the directory."""
+        with open(temp_path, 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+
+        # Persist the rename itself
+        dir_fd = os.open(self.data_dir, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def compact_guild(self, guild_id: int, data: Dict):
+        """Fold the guild's sidecar into its main JSON file, then empty the sidecar."""
+        self._flush_guild_data(guild_id, data)
+
+        # Only truncate once the main file is known to hold every fact
+        sidecar_path = self._get_sidecar_file(guild_id)
+        if str(guild_id) not in self._dirty and os.path.exists(sidecar_path):
+            try:
+                open(sidecar_path, 'wb').close()
+            except IOError as e:
+                print(f"Error truncating fact log for guild {guild_id}: {e}")
+
+    def _compact_logged(self, guild_id: int, data: Dict):
+        """Compact a guild, logging any failure so it can't stop other guilds' writes."""
+        try:
+            self.compact_guild(guild_id, data)
+        except Exception as e:
+            print(f"Error compacting guild {guild_id} data: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def flush_all(self):
+        """Compact every dirty guild to disk now (used on shutdown)."""
+        for guild_key in list(self._dirty):
+            data = self.cache.get(guild_key)
+            if data is None:
+                self._dirty.discard(guild_key)
+                continue
+            self._compact_logged(int(guild_key), data)
+
+    async def flush_dirty(self, interval: float = RAG_FLUSH_INTERVAL):
+        """Background task: periodically write guilds changed since the last flush.
+
+        Failures are logged per guild (and the guild stays dirty for the next
+        round), so nothing ends this loop but cancellation.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            if self._dirty:
+                self.flush_all()
+
     def is_rag_channel(self, channel_name: str, channel_topic: Optional[str]) -> bool:
         """Check if channel is a designated RAG channel."""
         if not RAG_CHANNEL_ENABLED:
             return False
 
+        # Check channel name against pattern (cheapest test first)
+        if _CHANNEL_KEYWORDS is not None:
+            name_lc = channel_name.lower()
+            if any(k in name_lc for k in _CHANNEL_KEYWORDS):
+                return True
+        elif _CHANNEL_NAME_RE.search(channel_name):
+            return True
+
         # Check channel topic for explicit tag
         if channel_topic:
             # Look for "rag: true" in topic
-            if re.search(r'rag:\s*true', channel_topic, re.IGNORECASE):
+            if _RAG_TOPIC_RE.search(channel_topic):
                 return True
 
-        # Check channel name against pattern
-        if re.search(RAG_CHANNEL_PATTERN, channel_name, re.IGNORECASE):
-            return True
-
         return False
 
     # ==================== Vector Database Methods ====================
@@ -330,21 +713,10 @@ class RAGManager:
 
     def extract_keywords(self, text: str) -> List[str]:
         """Extract keywords from text (lowercase, no stopwords)."""
-        # Tokenize: split on non-alphanumeric
-        tokens = re.findall(r'\w+', text.lower())
-
-        # Filter stopwords and short tokens
-        keywords = [t for t in tokens if t not in STOPWORDS and len(t) > 2]
-
-        # Remove duplicates while preserving order
-        seen: Set[str] = set()
-        unique_keywords = []
-        for kw in keywords:
-            if kw not in seen:
-                seen.add(kw)
-                unique_keywords.append(kw)
-
-        return unique_keywords
+        # Tokenize on non-alphanumerics, drop short tokens (cheapest test first) and
+        # stopwords, then dedupe while preserving order
+        tokens = _TOKEN_RE.findall(text.lower())
+        return list(dict.fromkeys(t for t in tokens if len(t) > 2 and t not in STOPWORDS))
 
     def calculate_keyword_overlap(self, keywords1: List[str], keywords2: List[str]) -> float:
         """Calculate keyword overlap ratio."""
@@ -357,23 +729,46 @@ class RAGManager:
         overlap = len(set1 & set2)
         return overlap / len(set1)
 
-    def search_facts(self, facts: List[Dict], query_keywords: List[str]) -> List[Dict]:
-        """Search facts by keyword matching with verified boost."""
-        if not query_keywords:
+    def search_facts(self, facts: List[Dict], query_set: Set[str], query_len: int,
+                     index: Optional[Dict[str, List[int]]] = None,
+                     fact_sets: Optional[List[Set[str]]] = None) -> List[Dict]:
+        """Search facts by keyword matching with verified boost.
+
+        query_set and query_len come from the query keywords, built once by the
+        caller. With an inverted index only facts sharing a query keyword are
+        scored; a threshold of 0 or less admits non-matching facts, so that
+        falls back to a full scan. fact_sets, if given, holds each fact's
+        keyword set in fact order so the scan doesn't rebuild them.
+        """
+        if not query_len:
             return []
 
         scored_facts = []
-        query_set = set(query_keywords)
 
-        for fact in facts:
-            fact_keywords = set(fact.get("keywords", []))
+        if index is not None and RAG_KEYWORD_MATCH_THRESHOLD > 0:
+            # Posting-list hit counts are the overlap sizes
+            hits: Counter = Counter()
+            for kw in query_set:
+                hits.update(index.get(kw, ()))
+
+            # Score in fact order so ties sort the same as a full scan
+            for i in sorted(hits):
+                score = hits[i] / query_len
+                fact = facts[i]
+                if fact.get("verified", False):
+                    score *= RAG_VERIFIED_BOOST
+                if score >= RAG_KEYWORD_MATCH_THRESHOLD:
+                    scored_facts.append((score, fact))
+
+            scored_facts.sort(key=lambda x: x[0], reverse=True)
+            return [fact for score, fact in scored_facts[:RAG_MAX_CONTEXT_FACTS]]
 
+        if fact_sets is None:
+            fact_sets = [set(fact.get("keywords", ())) for fact in facts]
+
+        for fact, fact_keywords in zip(facts, fact_sets):
             # Calculate base score
-            if not query_keywords:
-                score = 0.0
-            else:
-                overlap = len(query_set & fact_keywords)
-                score = overlap / len(query_keywords)
+            score = len(query_set & fact_keywords) / query_len
 
             # Boost verified facts
             if fact.get("verified", False):
@@ -402,29 +797,9 @@ class RAGManager:
 
         expanded = query
 
-        # Replace common first-person patterns (case-insensitive)
-        # "where do I" -> "where does {name}"
-        expanded = re.sub(r'\bdo I\b', f'does {author_name}', expanded, flags=re.IGNORECASE)
-        # "am I" -> "is {name}"
-        expanded = re.sub(r'\bam I\b', f'is {author_name}', expanded, flags=re.IGNORECASE)
-        # "was I" -> "was {name}"
-        expanded = re.sub(r'\bwas I\b', f'was {author_name}', expanded, flags=re.IGNORECASE)
-        # "have I" -> "has {name}"
-        expanded = re.sub(r'\bhave I\b', f'has {author_name}', expanded, flags=re.IGNORECASE)
-        # "can I" -> "can {name}"
-        expanded = re.sub(r'\bcan I\b', f'can {author_name}', expanded, flags=re.IGNORECASE)
-        # "will I" -> "will {name}"
-        expanded = re.sub(r'\bwill I\b', f'will {author_name}', expanded, flags=re.IGNORECASE)
-        # "did I" -> "did {name}"
-        expanded = re.sub(r'\bdid I\b', f'did {author_name}', expanded, flags=re.IGNORECASE)
-        # Standalone "I" at word boundary -> "{name}"
-        expanded = re.sub(r'\bI\b', author_name, expanded)
-        # "my" -> "{name}'s"
-        expanded = re.sub(r'\bmy\b', f"{author_name}'s", expanded, flags=re.IGNORECASE)
-        # "me" -> "{name}"
-        expanded = re.sub(r'\bme\b', author_name, expanded, flags=re.IGNORECASE)
-        # "mine" -> "{name}'s"
-        expanded = re.sub(r'\bmine\b', f"{author_name}'s", expanded, flags=re.IGNORECASE)
+        # Replace common first-person patterns (case-insensitive except standalone "I")
+        for pattern, template in _FIRST_PERSON_PATTERNS:
+            expanded = pattern.sub(template.format(name=author_name), expanded)
 
         if expanded != query:
             print(f"[RAG] Query expanded: '{query}' -> '{expanded}'")
@@ -454,8 +829,9 @@ class RAGManager:
                     print(f"[RAG] Lazy migration: {json_count} JSON facts, {vector_count} vector facts")
                     self.migrate_to_vector_db(guild_id)
 
-                # Search using vector similarity with expanded query
-                relevant_facts = self.search_facts_vector(guild_id, expanded_query)
+                # Search using vector similarity with expanded query (embedding and
+                # ChromaDB query are blocking, so run them off the event loop)
+                relevant_facts = await asyncio.to_thread(self.search_facts_vector, guild_id, expanded_query)
 
                 if relevant_facts:
                     # Format context string
@@ -473,8 +849,20 @@ class RAGManager:
             if not query_keywords:
                 return None
 
-            # Search for relevant facts using keywords
-            relevant_facts = self.search_facts(facts, query_keywords)
+            # Search for relevant facts using keywords (query set built once here),
+            # reusing the result of an identical query against unchanged facts
+            guild_key = str(guild_id)
+            cache_key = (guild_key, tuple(sorted(query_keywords)), self._facts_version.get(guild_key, 0))
+            relevant_facts = self._retrieval_cache.get(cache_key)
+            if relevant_facts is None:
+                relevant_facts = self.search_facts(
+                    facts, set(query_keywords), len(query_keywords),
+                    self._indexes.get(guild_key), self._fact_sets.get(guild_key)
+                )
+                self._retrieval_cache[cache_key] = relevant_facts
+                if len(self._retrieval_cache) > RETRIEVAL_CACHE_SIZE:
+                    self._retrieval_cache.popitem(last=False)
+            self._retrieval_cache.move_to_end(cache_key)
 
             if not relevant_facts:
                 return None
@@ -539,132 +927,211 @@ Example output:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(LLM_URL, json=payload) as resp:
-                    if resp.status != 200:
-                        print(f"LLM chunking failed: {resp.status}")
-                        return [content]  # Fallback to single chunk
-
-                    data = await resp.json()
-                    response_text = data["choices"][0]["message"]["content"].strip()
-
-                    # Try to parse JSON array from response
-                    # First, try to find a JSON array in the response
-                    json_match = re.search(r'\[\s*".*\]\s*$', response_text, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(0)
-                    else:
-                        # If no match, maybe the response IS the JSON array
-                        json_str = response_text
+            session = await self._get_session()
+            async with session.post(LLM_URL, json=payload) as resp:
+                if resp.status != 200:
+                    print(f"LLM chunking failed: {resp.status}")
+                    return [content]  # Fallback to single chunk
+
+                data = await resp.json()
+                response_text = data["choices"][0]["message"]["content"].strip()
+
+                # Try to parse JSON array from response
+                # First, try to find a JSON array in the response
+                json_match = _JSON_STRING_ARRAY_RE.search(response_text)
+                if json_match:
+                    json_str = json_match.group(0)
+                else:
+                    # If no match, maybe the response IS the JSON array
+                    json_str = response_text
 
-                    # Debug: show what we're trying to parse
-                    print(f"[RAG] Attempting to parse JSON (length: {len(json_str)}, first 200 chars): {json_str[:200]}")
+                # Debug: show what we're trying to parse
+                print(f"[RAG] Attempting to parse JSON (length: {len(json_str)}, first 200 chars): {json_str[:200]}")
 
-                    try:
-                        chunks = json.loads(json_str)
-                        if isinstance(chunks, list) and len(chunks) > 0 and all(isinstance(c, str) for c in chunks):
-                            print(f"[RAG] Successfully split message into {len(chunks)} contextual chunks")
-                            return chunks
-                        else:
-                            print(f"[RAG] Parsed JSON but not valid format (type: {type(chunks)}, len: {len(chunks) if isinstance(chunks, list) else 'N/A'})")
-                    except json.JSONDecodeError as e:
-                        print(f"[RAG] JSON decode error: {e}")
-                        print(f"[RAG] Full response text: {response_text}")
-
-                    # Fallback if parsing fails
-                    print(f"[RAG] Chunking failed to parse, using original message")
-                    return [content]
+                try:
+                    chunks = json.loads(json_str)
+                    if isinstance(chunks, list) and len(chunks) > 0 and all(isinstance(c, str) for c in chunks):
+                        print(f"[RAG] Successfully split message into {len(chunks)} contextual chunks")
+                        return chunks
+                    else:
+                        print(f"[RAG] Parsed JSON but not valid format (type: {type(chunks)}, len: {len(chunks) if isinstance(chunks, list) else 'N/A'})")
+                except json.JSONDecodeError as e:
+                    print(f"[RAG] JSON decode error: {e}")
+                    print(f"[RAG] Full response text: {response_text}")
+
+                # Fallback if parsing fails
+                print(f"[RAG] Chunking failed to parse, using original message")
+                return [content]
         except Exception as e:
             print(f"Error chunking message: {e}")
             return [content]  # Fallback
 
     async def extract_facts_from_message(self, message, content: str, is_rag_channel: bool = False):
-        """Extract facts from a message using LLM."""
+        """Extract facts from a message using LLM.
+
+        The message joins the extraction queue and this returns once its batch
+        has been processed. One worker drains the queue, so the LLM server sees
+        one extraction request at a time however many messages arrive.
+        """
         if not RAG_EXTRACTION_ENABLED:
             return
 
-        try:
-            guild_id = message.guild.id
-
-            # Create extraction prompt
-            system_prompt = """Extract factual information from the following message. Return ONLY a JSON array of facts.
-Each fact should have:
-- content: The fact as a complete sentence
-- category: One of [birthday, location, contact, preference, general]
-- confidence: A score from 0 to 1 indicating your confidence in the fact
-- keywords: Array of searchable keywords (lowercase, no stopwords). IMPORTANT: Always include person names, places, and other entity names as keywords!
-- entities: Object with extracted entities (e.g., {"person": "John Smith", "date": "May 15, 1990"})
+        # Start the batch worker on first use (needs a running event loop)
+        if self._extract_task is None or self._extract_task.done():
+            self._extract_task = asyncio.create_task(self._batch_extractor())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._extract_queue.put((message, content, is_rag_channel, future))
+        await future
+
+    async def _batch_extractor(self):
+        """Background task: collect queued messages and extract their facts in batches."""
+        wait = RAG_EXTRACTION_BATCH_WAIT_MS / 1000
+        while True:
+            batch = [await self._extract_queue.get()]
+
+            # Gather more messages until the batch is full or the wait runs out
+            deadline = asyncio.get_running_loop().time() + wait
+            while len(batch) < max(1, RAG_EXTRACTION_BATCH_SIZE):
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._extract_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
 
-CRITICAL RULES:
-1. ALWAYS preserve FULL NAMES (first AND last name) when available. Never shorten to just first name.
-   - "Cameron River's address is 123 Main St" - CORRECT
-   - "Cameron's address is 123 Main St" - WRONG (missing last name)
+            try:
+                await self._extract_and_store([item[:3] for item in batch])
+            except Exception as e:
+                print(f"[RAG] Error in batch extraction: {e}")
+            finally:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def _extract_and_store(self, items: List[tuple]):
+        """Extract facts for (message, content, is_rag_channel) items and store them."""
+        if len(items) == 1:
+            results = [await self._request_extraction(items[0][0], items[0][1])]
+        else:
+            results = await self._request_batch_extraction(items)
+            if results is None:
+                # Batch response unusable, retry the messages one at a time
+                print(f"[RAG] Batch extraction failed, falling back to {len(items)} single request(s)")
+                results = [await self._request_extraction(message, content) for message, content, _ in items]
+
+        # Store in queue order so duplicate checks match one-at-a-time processing
+        for (message, content, is_rag_channel), extracted_facts in zip(items, results):
+            if extracted_facts:
+                self._store_facts(message, content, is_rag_channel, extracted_facts)
+
+    async def _post_extraction(self, user_prompt: str, system_prompt: str) -> Optional[str]:
+        """Send an extraction prompt to the LLM and return the response text."""
+        payload = {
+            "model": LLM_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": RAG_EXTRACTION_MAX_TOKENS
+        }
 
-2. Replace first-person pronouns (I, me, my, mine) with the author's name.
-   - If author is "Cameron" and message is "I live in Seattle":
-   - content should be: "Cameron lives in Seattle"
+        # Make LLM request
+        session = await self._get_session()
+        async with session.post(LLM_URL, json=payload) as resp:
+            if resp.status != 200:
+                print(f"LLM API error during fact extraction: {resp.status}")
+                return None
 
-3. When extracting from structured contact data, preserve the full name for EACH fact.
-   - Input: "John Smith - Birthday: Jan 1 - Email: john@email.com"
-   - Output facts should be: "John Smith's birthday is Jan 1", "John Smith's email is john@email.com"
-   - NOT: "John's birthday is Jan 1" (missing last name)
+            data = await resp.json()
+            return data["choices"][0]["message"]["content"].strip()
 
-4. Include full names (all parts) in keywords.
-   - keywords should be: ["john", "smith", "birthday", "jan"]
-   - NOT just: ["john", "birthday", "jan"]
+    def _parse_extraction(self, response_text: str) -> Optional[list]:
+        """Parse the JSON array from an extraction response."""
+        try:
+            # Try to extract JSON array from response
+            json_match = _JSON_ARRAY_RE.search(response_text)
+            if json_match:
+                parsed = json.loads(json_match.group(0))
+            else:
+                parsed = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse extraction response as JSON: {e}")
+            print(f"Response: {response_text[:200]}")
+            return None
 
-Return [] if no facts are found. Do not include conversational or hypothetical statements."""
+        if not isinstance(parsed, list):
+            print(f"Invalid extraction response: not a list")
+            return None
+        return parsed
 
-            user_prompt = f"""Message: "{content}"
+    async def _request_extraction(self, message, content: str) -> Optional[list]:
+        """Extract facts from one message. Returns None on failure."""
+        user_prompt = f"""Message: "{content}"
 Author: {message.author.display_name}"""
 
-            payload = {
-                "model": LLM_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.1,
-                "max_tokens": RAG_EXTRACTION_MAX_TOKENS
-            }
+        try:
+            response_text = await self._post_extraction(user_prompt, _EXTRACTION_PROMPT)
+        except Exception as e:
+            print(f"Error extracting facts from message: {e}")
+            return None
 
-            # Make LLM request
-            async with aiohttp.ClientSession() as session:
-                async with session.post(LLM_URL, json=payload) as resp:
-                    if resp.status != 200:
-                        print(f"LLM API error during fact extraction: {resp.status}")
-                        return
+        if response_text is None:
+            return None
+        return self._parse_extraction(response_text)
 
-                    data = await resp.json()
-                    response_text = data["choices"][0]["message"]["content"].strip()
+    async def _request_batch_extraction(self, items: List[tuple]) -> Optional[List[list]]:
+        """Extract facts from several messages in one request.
 
-            # Parse JSON response
-            try:
-                # Try to extract JSON array from response
-                json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-                if json_match:
-                    extracted_facts = json.loads(json_match.group(0))
-                else:
-                    extracted_facts = json.loads(response_text)
+        Returns one fact list per item, or None if the response doesn't have
+        exactly one array per message.
+        """
+        user_prompt = "\n\n".join(
+            f"""Message {i}: "{content}"
+Author: {message.author.display_name}"""
+            for i, (message, content, _) in enumerate(items, 1)
+        )
+
+        try:
+            response_text = await self._post_extraction(user_prompt, _BATCH_EXTRACTION_PROMPT)
+        except Exception as e:
+            print(f"Error extracting facts from batch: {e}")
+            return None
+
+        if response_text is None:
+            return None
 
-                if not isinstance(extracted_facts, list):
-                    print(f"Invalid extraction response: not a list")
-                    return
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse extraction response as JSON: {e}")
-                print(f"Response: {response_text[:200]}")
-                return
+        results = self._parse_extraction(response_text)
+        if results is None or len(results) != len(items) or not all(isinstance(r, list) for r in results):
+            return None
+        return results
 
-            if not extracted_facts:
-                return
+    def _store_facts(self, message, content: str, is_rag_channel: bool, extracted_facts: list):
+        """Deduplicate extracted facts and add new ones to the guild's knowledge base."""
+        try:
+            guild_id = message.guild.id
 
             # Load guild data
             guild_data = self.load_guild_data(guild_id)
             existing_facts = guild_data.get("facts", [])
 
-            # Process each extracted fact
+            # Keyword sets of stored facts for the duplicate checks below (the cached
+            # per-guild list, so facts added here keep it in step with the facts)
+            guild_key = str(guild_id)
+            existing_sets = self._fact_sets.get(guild_key)
+            if existing_sets is None or len(existing_sets) != len(existing_facts):
+                self._index_guild(guild_key, existing_facts)
+                existing_sets = self._fact_sets[guild_key]
+            signatures = self._kw_signatures[guild_key]
+
+            # Process each extracted fact (one timestamp for the whole batch)
             new_facts_added = 0
+            now = _utcnow_iso()
             for fact in extracted_facts:
+                # Long numbers (keywords, entities) are kept as strings, see _stringify_big_ints
+                fact = _stringify_big_ints(fact)
                 confidence = fact.get("confidence", 0.0)
 
                 # Apply confidence threshold (unless from RAG channel)
@@ -675,16 +1142,13 @@ Author: {message.author.display_name}"""
                 if "keywords" not in fact or not fact["keywords"]:
                     fact["keywords"] = self.extract_keywords(fact.get("content", ""))
 
-                # Check for duplicates
-                is_duplicate = False
-                for existing_fact in existing_facts:
-                    existing_keywords = existing_fact.get("keywords", [])
-                    overlap = self.calculate_keyword_overlap(fact["keywords"], existing_keywords)
-                    if overlap > 0.7:  # 70% overlap threshold
-                        is_duplicate = True
-                        break
-
-                if is_duplicate:
+                # Check for duplicates (same ratio as calculate_keyword_overlap, 70% threshold);
+                # an identical keyword set is 100% overlap, so reject those by hash first
+                new_set = set(fact["keywords"])
+                if new_set and (
+                    frozenset(new_set) in signatures
+                    or any(len(new_set & es) / len(new_set) > 0.7 for es in existing_sets)
+                ):
                     continue
 
                 # Create fact entry
@@ -705,11 +1169,17 @@ Author: {message.author.display_name}"""
                         "timestamp": message.created_at.isoformat() + "Z",
                         "original_message": content[:200]  # Truncate
                     },
-                    "created_at": datetime.utcnow().isoformat() + "Z"
+                    "created_at": now
                 }
 
+                # Log the fact first, so nothing unwritable reaches the in-memory data
+                if not self._append_fact(guild_id, fact_entry):
+                    continue
+
                 # Add to facts
                 existing_facts.append(fact_entry)
+                existing_sets.append(new_set)
+                self._index_fact(guild_key, len(existing_facts) - 1, new_set)
                 new_facts_added += 1
 
                 # Add to vector database
@@ -730,12 +1200,13 @@ Author: {message.author.display_name}"""
                 guild_data["metadata"]["total_facts"] = len(existing_facts)
                 guild_data["metadata"]["total_messages_processed"] = guild_data["metadata"].get("total_messages_processed", 0) + 1
 
-                # Save
-                self.save_guild_data(guild_id, guild_data)
+                # New facts are already in the sidecar; the next flush compacts them
+                # into the main file along with the metadata updates
+                self.mark_dirty(guild_id, guild_data)
 
                 print(f"[RAG] Extracted {new_facts_added} fact(s) from message in #{message.channel.name} (verified: {is_rag_channel})")
 
         except Exception as e:
-            print(f"Error extracting facts from message: {e}")
+            print(f"Error storing facts from message: {e}")
             import traceback
             traceback.print_exc()
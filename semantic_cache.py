@@ -0,0 +1,210 @@
+import os
+import json
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+# Approximate nearest-neighbour index (falls back to a linear scan if missing)
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+# HNSW index parameters
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Scale for storing unit-length embeddings as int8 in the linear-scan fallback
+INT8_SCALE = 127
+
+# Rows converted to float32 at a time when scanning the int8 fallback, so a lookup
+# never materializes a float32 copy of the whole matrix
+SCAN_BLOCK_ROWS = 1024
+
+
+class SemanticCache:
+    """Translation cache that matches near-duplicate messages by embedding similarity."""
+
+    def __init__(self, model_name: str, threshold: float = 0.93, max_entries: int = 10000,
+                 persist_dir: Optional[str] = None, name: str = "translate_cache",
+                 model: Optional[SentenceTransformer] = None):
+        """name prefixes the persisted files; pass an already loaded model to share it between caches."""
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir
+        self.name = name
+
+        if model is None:
+            print(f"[Cache] Loading embedding model: {model_name}")
+            model = SentenceTransformer(model_name)
+            print(f"[Cache] Embedding model loaded ({model.get_sentence_embedding_dimension()} dims)")
+        self.model = model
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+        if HNSW_AVAILABLE:
+            # HNSW index with translations keyed by label; labels kept in
+            # insertion order so the oldest can be evicted (FIFO)
+            self.index = None
+            self.translations: Dict[int, str] = {}
+            self.labels: Deque[int] = deque()
+            self.next_label = 0
+            if not self.load():
+                self._init_index()
+        else:
+            print("[Cache] hnswlib not installed, using linear scan")
+            # Ring buffer of int8-quantized, L2-normalized embeddings with parallel
+            # translations; once full, new entries overwrite the oldest (FIFO eviction)
+            self.index = None
+            self.embeddings = np.zeros((max_entries, self.dim), dtype=np.int8)
+            self.slots: List[Optional[str]] = [None] * max_entries
+            self.count = 0
+            self.next_slot = 0
+
+    def _init_index(self):
+        """Create an empty HNSW index."""
+        self.index = hnswlib.Index(space="cosine", dim=self.dim)
+        self.index.init_index(
+            max_elements=self.max_entries,
+            M=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            allow_replace_deleted=True
+        )
+        self.index.set_ef(HNSW_EF_SEARCH)
+        self.translations = {}
+        self.labels = deque()
+        self.next_label = 0
+
+    def _get_paths(self) -> Tuple[str, str]:
+        """Get the file paths for the persisted index and its translations."""
+        return (
+            os.path.join(self.persist_dir, f"{self.name}.hnsw"),
+            os.path.join(self.persist_dir, f"{self.name}.json")
+        )
+
+    def load(self) -> bool:
+        """Load a persisted HNSW index. Returns False if there is nothing usable."""
+        if not self.persist_dir:
+            return False
+
+        index_path, meta_path = self._get_paths()
+        if not os.path.exists(index_path) or not os.path.exists(meta_path):
+            return False
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            # An index built with a different model can't be searched with this one
+            if meta.get("model") != self.model_name:
+                print("[Cache] Persisted index uses a different model, starting fresh")
+                return False
+
+            self.index = hnswlib.Index(space="cosine", dim=self.dim)
+            self.index.load_index(index_path, max_elements=self.max_entries, allow_replace_deleted=True)
+            self.index.set_ef(HNSW_EF_SEARCH)
+            self.translations = {int(label): text for label, text in meta["translations"].items()}
+            self.labels = deque(meta["labels"])
+            self.next_label = meta["next_label"]
+        except Exception as e:
+            print(f"[Cache] Error loading persisted index: {e}")
+            return False
+
+        print(f"[Cache] Loaded {len(self.translations)} cached translations from {index_path}")
+        return True
+
+    def save(self):
+        """Persist the HNSW index and translations to disk."""
+        if not self.persist_dir or self.index is None:
+            return
+
+        index_path, meta_path = self._get_paths()
+        meta = {
+            "model": self.model_name,
+            "labels": list(self.labels),
+            "next_label": self.next_label,
+            "translations": self.translations
+        }
+
+        try:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self.index.save_index(index_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            print(f"[Cache] Saved {len(self.translations)} cached translations to {index_path}")
+        except (IOError, RuntimeError) as e:
+            print(f"[Cache] Error saving index: {e}")
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Generate an L2-normalized embedding for text."""
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    async def lookup(self, text: str) -> Tuple[np.ndarray, Optional[str]]:
+        """Find a cached translation for text.
+
+        Returns the query embedding (for a later add()) and the cached
+        translation if the best match is at or above the similarity threshold.
+        """
+        # Embedding is CPU-bound, keep it off the event loop
+        query = await asyncio.to_thread(self._embed, text)
+
+        if not len(self):
+            return query, None
+
+        if self.index is not None:
+            # hnswlib cosine distance is 1 - similarity
+            labels, distances = self.index.knn_query(query, k=1)
+            if 1.0 - distances[0][0] >= self.threshold:
+                return query, self.translations.get(int(labels[0][0]))
+            return query, None
+
+        # Dot product of normalized vectors is cosine similarity; scale the query
+        # instead of every row to undo the int8 scale
+        scaled_query = query / INT8_SCALE
+        block = np.empty((min(SCAN_BLOCK_ROWS, self.count), self.dim), dtype=np.float32)
+        best, best_sim = -1, -np.inf
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            rows = self.embeddings[start:min(start + SCAN_BLOCK_ROWS, self.count)]
+            buf = block[:len(rows)]
+            np.copyto(buf, rows, casting='unsafe')
+            sims = buf @ scaled_query
+            i = int(np.argmax(sims))
+            if sims[i] > best_sim:
+                best, best_sim = start + i, sims[i]
+
+        if best_sim >= self.threshold:
+            return query, self.slots[best]
+        return query, None
+
+    def add(self, embedding: np.ndarray, translation: str):
+        """Add an entry, evicting the oldest entry once full."""
+        if self.index is not None:
+            # Evict the oldest entry; its slot is reused by replace_deleted
+            if len(self.labels) >= self.max_entries:
+                oldest = self.labels.popleft()
+                self.index.mark_deleted(oldest)
+                del self.translations[oldest]
+
+            label = self.next_label
+            self.next_label += 1
+            self.index.add_items(embedding[np.newaxis, :], [label], replace_deleted=True)
+            self.translations[label] = translation
+            self.labels.append(label)
+            return
+
+        slot = self.next_slot
+        self.embeddings[slot] = np.round(embedding * INT8_SCALE).astype(np.int8)
+        self.slots[slot] = translation
+
+        self.next_slot = (slot + 1) % self.max_entries
+        self.count = min(self.count + 1, self.max_entries)
+
+    def __len__(self) -> int:
+        if self.index is not None:
+            return len(self.translations)
+        return self.count